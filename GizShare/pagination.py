@@ -0,0 +1,314 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework import exceptions
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class InvalidCursor(ValueError):
+    """Raised by ranked sources handed a position they cannot resume from."""
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination, newest first on ``(created_at, id)`` by default.
+
+    Each page is fetched with a ``WHERE (created_at, id) < cursor`` predicate
+    backed by a composite index instead of an ``OFFSET`` scan, so every page
+    costs the same. Responses keep the ``count``/``next``/``previous``/``results``
+    shape of the limit/offset pagination it replaces; clients that do not need
+    the total can pass ``?count=false`` to skip the ``COUNT(*)``.
+
+    A queryset that is already ordered on non-nullable model fields in a single
+    direction keeps its ordering, with ``id`` appended as the tiebreaker. Any
+    other ordering (annotations, nullable fields, search relevance) is kept and
+    paged by offset instead.
+    """
+    page_size = api_settings.PAGE_SIZE or 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    include_count = True
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.count = queryset.count() if self.get_include_count(request) else None
+
+        self.offset = 0
+        self.reverse = False
+        if self.ordering is None:
+            self.offset = self.decode_offset_cursor(request)
+            results = list(queryset[self.offset:self.offset + self.page_size + 1])
+            self.has_next = len(results) > self.page_size
+            self.has_previous = self.offset > 0
+            self.page = results[:self.page_size]
+            return self.page
+
+        queryset = queryset.order_by(*self.ordering)
+        position, self.reverse = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.get_seek_filter(position, self.reverse))
+        if self.reverse:
+            # Walk back from the cursor in the opposite order, then restore the page order.
+            queryset = queryset.reverse()
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_include_count(self, request):
+        value = request.query_params.get(self.count_query_param)
+        if value is None:
+            return self.include_count
+        return value.lower() in ('true', '1', 't')
+
+    def get_ordering(self, queryset):
+        """
+        Return the keyset ordering on column names (``user`` becomes ``user_id``),
+        or ``None`` when the queryset can only be paged by offset.
+        """
+        ordering = queryset.query.order_by or self.ordering
+        if not all(isinstance(field, str) for field in ordering) or '?' in ordering:
+            return None
+        descending = {field.startswith('-') for field in ordering}
+        if len(descending) != 1:
+            return None
+        descending = descending.pop()
+
+        columns = []
+        for name in ordering:
+            name = name.lstrip('-')
+            try:
+                field = queryset.model._meta.get_field('id' if name == 'pk' else name)
+            except FieldDoesNotExist:
+                return None
+            # A NULL never compares less or greater than the cursor, so those rows would be skipped.
+            if not getattr(field, 'concrete', False) or field.null or field.many_to_many or field.one_to_many:
+                return None
+            columns.append(('-' if descending else '') + field.attname)
+
+        if columns[-1].lstrip('-') != queryset.model._meta.pk.attname:
+            columns.append(('-' if descending else '') + queryset.model._meta.pk.attname)
+        return tuple(columns)
+
+    def get_seek_filter(self, position, reverse=False):
+        """Expand ``(f1, f2, ...) < (v1, v2, ...)`` into an index-friendly Q."""
+        fields = [field.lstrip('-') for field in self.ordering]
+        lookup = 'lt' if self.ordering[0].startswith('-') != reverse else 'gt'
+        leading = 'lte' if lookup == 'lt' else 'gte'
+
+        seek = Q()
+        for index, field in enumerate(fields):
+            branch = Q(**{f'{field}__{lookup}': position[index]})
+            for previous, value in zip(fields[:index], position[:index]):
+                branch &= Q(**{previous: value})
+            seek |= branch
+        return Q(**{f'{fields[0]}__{leading}': position[0]}) & seek
+
+    def get_position(self, row):
+        return [getattr(row, field.lstrip('-')) for field in self.ordering]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        if self.ordering is None:
+            cursor = self.encode_cursor({'offset': self.offset + self.page_size})
+        else:
+            cursor = self.encode_cursor(self.get_position(self.page[-1]))
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.ordering is None:
+            cursor = self.encode_cursor({'offset': max(self.offset - self.page_size, 0)})
+        elif self.page:
+            cursor = self.encode_cursor({'before': self.encode_position(self.get_position(self.page[0]))})
+        else:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def encode_cursor(self, position):
+        if isinstance(position, dict):
+            return self._encode(position)
+        return self._encode(self.encode_position(position))
+
+    @staticmethod
+    def encode_position(position):
+        values = []
+        for value in position:
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = str(value)
+            values.append(value)
+        return values
+
+    def decode_cursor(self, request, model):
+        """Return ``(position, reverse)``; ``reverse`` is set for cursors of ``previous`` links."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            values = self._decode(encoded)
+            reverse = isinstance(values, dict)
+            if reverse:
+                values = values['before']
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [self.to_python(model, field.lstrip('-'), value)
+                    for field, value in zip(self.ordering, values)], reverse
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def decode_offset_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return 0
+        try:
+            offset = int(self._decode(encoded)['offset'])
+            if offset < 0:
+                raise ValueError
+            return offset
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _encode(value):
+        return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode(encoded):
+        return json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+
+    @staticmethod
+    def to_python(model, name, value):
+        field = next(field for field in model._meta.concrete_fields if field.attname == name)
+        if value is None:
+            raise ValueError
+        return field.target_field.to_python(value) if field.is_relation else field.to_python(value)
+
+
+class TimelinePagination(KeysetPagination):
+    """Keyset pagination over a precomputed home timeline, newest first."""
+    include_count = False
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('posts', data),
+        ]))
+
+
+class SearchPagination(KeysetPagination):
+    """
+    Pages search results (or any other ranked list of ids) without pushing the list into SQL.
+
+    The search backend returns one page of ids, each with an opaque position to
+    resume after it (an offset or an Elasticsearch ``search_after`` key). Only
+    those rows are loaded, with a single ``id__in`` query, and put back in hit
+    order in Python, so the database cost stays O(page size) however many
+    documents match. Hits the queryset filters out are skipped and the next
+    hits fetched, up to ``max_fetches`` round trips, so filtered pages stay full.
+    """
+    max_fetches = 5
+
+    def paginate_search(self, backend, query, queryset, request):
+        return self.paginate_ranked(lambda position, size: backend.search_page(query, position, size),
+                                    queryset, request)
+
+    def paginate_ranked(self, fetch_page, queryset, request):
+        """
+        Page any ranked id source: ``fetch_page(position, size)`` returns ``(hits, next_position)``,
+        ``hits`` being ``(id, position after it)`` pairs and ``next_position`` ``None`` at the end.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = None
+        self.page, self.next_position = [], self.decode_search_cursor(request)
+        for _ in range(self.max_fetches):
+            try:
+                hits, next_position = fetch_page(self.next_position, self.page_size)
+            except InvalidCursor as e:
+                raise exceptions.ValidationError({self.cursor_query_param: str(e)})
+            rows = {row.id: row for row in queryset.filter(id__in=[hit_id for hit_id, _ in hits])}
+            for index, (hit_id, position) in enumerate(hits):
+                if hit_id not in rows:
+                    continue
+                self.page.append(rows[hit_id])
+                if len(self.page) == self.page_size:
+                    more = index < len(hits) - 1 or next_position is not None
+                    self.next_position = position if more else None
+                    return self.page
+            self.next_position = next_position
+            if next_position is None:
+                break
+        return self.page
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor({'after': self.next_position}))
+
+    def get_previous_link(self):
+        # Ranked sources (search_after keys, cached feeds) can only be walked forward.
+        return None
+
+    def decode_search_cursor(self, request):
+        """An offset, or a ``[score, id]`` sort key; anything else is rejected before it reaches a backend."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            position = self._decode(encoded)['after']
+        except (TypeError, ValueError, KeyError):
+            position = None
+        if self.is_offset(position) or (isinstance(position, list) and len(position) == 2
+                                        and all(self.is_number(value) for value in position)):
+            return position
+        raise exceptions.ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+
+    @staticmethod
+    def is_number(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    @classmethod
+    def is_offset(cls, value):
+        return isinstance(value, int) and cls.is_number(value) and value >= 0
@@ -1,10 +1,10 @@
-from asgiref.sync import sync_to_async
 from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.urls import path
 from django.core.asgi import get_asgi_application
-from rest_framework_simplejwt.backends import TokenBackend
-from user.models import User
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from user.cache import user_snapshot_cache
 from chat import consume
 
 websocket_urlpatterns = [
@@ -12,18 +12,21 @@ websocket_urlpatterns = [
 ]
 
 
-@sync_to_async
-def get_user(user):
+async def get_user(user):
     if user:
-        try:
-            return User.objects.select_related('userprofile').get(id=user)
-        except User.DoesNotExist as error:
-            print(error, 'erorr')
-            return None
+        return await user_snapshot_cache.get(user)
     else:
         return None
 
 
+def get_raw_token(header):
+    """Strip an optional ``Bearer``/``Token`` prefix from the authorization header."""
+    parts = header.split()
+    if len(parts) == 2 and parts[0].decode() in api_settings.AUTH_HEADER_TYPES:
+        return parts[1]
+    return header
+
+
 class TokenAuthMiddleware:
     """
     Token authorization middleware for Django Channels 2
@@ -39,8 +42,10 @@ class TokenAuthMiddleware:
             token_key = headers[b'authorization']
             if token_key:
                 try:
-                    valid_data = TokenBackend(algorithm='HS256').decode(token_key, verify=False)
-                    scope['user'] = await get_user(valid_data['user_id'])
+                    valid_data = AccessToken(get_raw_token(token_key))
+                    user = await get_user(valid_data[api_settings.USER_ID_CLAIM])
+                    if user is not None:
+                        scope['user'] = user
                 except Exception as v:
                     print('error', v)
 
@@ -0,0 +1,15 @@
+import os
+
+# Shared cache, also used for chat presence and interest feeds (Redis 7+). Without
+# CACHE_REDIS_URL every process gets its own local memory cache: it only sees the
+# sockets it holds itself, and posts pushed by a Celery worker never reach the
+# interest feeds cached in web processes until INTEREST_FEED_TTL expires them.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        },
+    }
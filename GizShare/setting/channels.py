@@ -0,0 +1,31 @@
+import os
+from GizShare.setting.funtion import get_int
+
+# Comma separated redis:// URLs. With more than one host channels_redis shards
+# channels and the per-user ``chat_<user_id>`` groups across them by consistent hashing.
+CHANNEL_REDIS_HOSTS = [host for host in os.environ.get('CHANNEL_REDIS_HOSTS', '').split(',') if host]
+
+if CHANNEL_REDIS_HOSTS:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": os.environ.get('CHANNEL_LAYER_BACKEND', 'channels_redis.core.RedisChannelLayer'),
+            "CONFIG": {
+                "hosts": CHANNEL_REDIS_HOSTS,
+                "prefix": os.environ.get('CHANNEL_LAYER_PREFIX', 'asgi'),
+                "capacity": get_int('CHANNEL_LAYER_CAPACITY', 1500),
+                "expiry": get_int('CHANNEL_LAYER_EXPIRY', 60),
+                "group_expiry": get_int('CHANNEL_LAYER_GROUP_EXPIRY', 86400),
+            },
+        },
+    }
+else:
+    # Single process only: group_send never leaves the Daphne worker that calls it.
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer"
+        }
+    }
+
+# Users resolved during WebSocket handshakes are cached per process for this long.
+WS_USER_CACHE_SIZE = get_int('WS_USER_CACHE_SIZE', 10000)
+WS_USER_CACHE_TTL = get_int('WS_USER_CACHE_TTL', 60)
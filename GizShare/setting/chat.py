@@ -0,0 +1,16 @@
+from GizShare.setting.funtion import get_bool, get_int
+
+# Reconnect replay: messages per chat_reconnect frame and frames sent per reconnect command.
+CHAT_REPLAY_FRAME_SIZE = get_int('CHAT_REPLAY_FRAME_SIZE', 200)
+CHAT_REPLAY_MAX_FRAMES = get_int('CHAT_REPLAY_MAX_FRAMES', 10)
+
+# Per-process write batching of chat messages (see chat/batcher.py).
+CHAT_WRITE_BATCHING = get_bool('CHAT_WRITE_BATCHING', False)
+CHAT_WRITE_BATCH_SIZE = get_int('CHAT_WRITE_BATCH_SIZE', 500)
+CHAT_WRITE_BATCH_INTERVAL_MS = get_int('CHAT_WRITE_BATCH_INTERVAL_MS', 5)
+
+# Presence (see chat/presence.py): a socket counts as online for PRESENCE_TTL seconds
+# after the last frame it received; last_seen is written back every flush interval.
+PRESENCE_TTL = get_int('PRESENCE_TTL', 90)
+PRESENCE_FLUSH_INTERVAL_MS = get_int('PRESENCE_FLUSH_INTERVAL_MS', 30000)
+PRESENCE_MAX_IDS = get_int('PRESENCE_MAX_IDS', 500)
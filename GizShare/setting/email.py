@@ -6,4 +6,7 @@ EMAIL_HOST = os.environ.get('EMAIL_HOST')
 EMAIL_USE_TLS = get_bool('EMAIL_USE_TLS', False)
 EMAIL_PORT = get_int('EMAIL_PORT')
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
-EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
\ No newline at end of file
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
+
+# Number of recipients handled by one post notification email task.
+POST_NOTIFICATION_EMAIL_CHUNK_SIZE = get_int('POST_NOTIFICATION_EMAIL_CHUNK_SIZE', 100)
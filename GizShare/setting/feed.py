@@ -0,0 +1,37 @@
+import os
+from GizShare.setting.funtion import get_bool, get_int
+
+# Maximum number of posts kept in a user's precomputed home timeline.
+TIMELINE_MAX_LENGTH = get_int('TIMELINE_MAX_LENGTH', 800)
+
+# Number of followers written per bulk insert when fanning a new post out.
+TIMELINE_FAN_OUT_BATCH_SIZE = get_int('TIMELINE_FAN_OUT_BATCH_SIZE', 1000)
+
+# Number of the followed user's latest posts copied into a timeline on follow.
+TIMELINE_BACKFILL_SIZE = get_int('TIMELINE_BACKFILL_SIZE', 50)
+
+# Buffer PostViewer inserts in process and write them with bulk_create.
+POST_VIEW_BUFFERING = get_bool('POST_VIEW_BUFFERING', False)
+POST_VIEW_BUFFER_SIZE = get_int('POST_VIEW_BUFFER_SIZE', 500)
+POST_VIEW_FLUSH_INTERVAL_MS = get_int('POST_VIEW_FLUSH_INTERVAL_MS', 2000)
+
+# Repeat views of a post by the same user within this window are merged into one.
+POST_VIEW_MERGE_WINDOW_SECONDS = get_int('POST_VIEW_MERGE_WINDOW_SECONDS', 30 * 60)
+
+# Hashtags: tags kept per post, the trending window and how long hourly buckets are kept.
+HASHTAG_MAX_PER_POST = get_int('HASHTAG_MAX_PER_POST', 30)
+HASHTAG_TREND_WINDOW_HOURS = get_int('HASHTAG_TREND_WINDOW_HOURS', 24)
+HASHTAG_TREND_RETENTION_HOURS = get_int('HASHTAG_TREND_RETENTION_HOURS', 48)
+HASHTAG_TRENDING_LIMIT = get_int('HASHTAG_TRENDING_LIMIT', 10)
+
+# Interest feed: ranked candidates cached per user, how long a cached feed lives and
+# how many hours newer a post matching an interested topic ranks than a category-only match.
+INTEREST_FEED_SIZE = get_int('INTEREST_FEED_SIZE', 500)
+INTEREST_FEED_TTL = get_int('INTEREST_FEED_TTL', 3600)
+INTEREST_TOPIC_BOOST_HOURS = get_int('INTEREST_TOPIC_BOOST_HOURS', 24)
+
+# Post ranking (see api/ranking.py): the ranker class, the half-life of engagement as a post
+# ages and the engagement a new post starts with.
+POST_RANKER = os.environ.get('POST_RANKER', 'api.ranking.DecayedEngagementRanker')
+POST_SCORE_HALF_LIFE_HOURS = get_int('POST_SCORE_HALF_LIFE_HOURS', 24)
+POST_SCORE_NEW_POST = get_int('POST_SCORE_NEW_POST', 3)
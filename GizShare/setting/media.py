@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 
-from GizShare.setting.funtion import get_bool
+from GizShare.setting.funtion import get_bool, get_int
 from GizShare.settings import BASE_DIR
 
 if get_bool('USE_S3', False):
@@ -28,3 +28,10 @@ else:
 
     STATIC_ROOT = Path(BASE_DIR, 'static_cdn')
     MEDIA_ROOT = Path(BASE_DIR, 'media_cdn')
+
+# Post images are re-encoded in the background to these widths (px) and formats for srcset.
+POST_IMAGE_VARIANT_WIDTHS = [int(width) for width in os.environ.get('POST_IMAGE_VARIANT_WIDTHS', '320,640,1080').split(',')
+                             if width]
+POST_IMAGE_VARIANT_FORMATS = [name for name in os.environ.get('POST_IMAGE_VARIANT_FORMATS', 'webp,jpeg').split(',')
+                              if name]
+POST_IMAGE_VARIANT_QUALITY = get_int('POST_IMAGE_VARIANT_QUALITY', 80)
@@ -0,0 +1,17 @@
+from GizShare.setting.funtion import get_bool, get_int
+
+# Notification rows created per bulk_create when fanning a new post out to followers.
+NOTIFICATION_BATCH_SIZE = get_int('NOTIFICATION_BATCH_SIZE', 1000)
+# Likes of one post within this many hours share one aggregated notification.
+LIKE_NOTIFICATION_WINDOW_HOURS = get_int('LIKE_NOTIFICATION_WINDOW_HOURS', 24)
+# Read notifications are deleted this many days after they were read.
+NOTIFICATION_READ_RETENTION_DAYS = get_int('NOTIFICATION_READ_RETENTION_DAYS', 30)
+# Every notification, read or not, is deleted after this many days.
+NOTIFICATION_MAX_AGE_DAYS = get_int('NOTIFICATION_MAX_AGE_DAYS', 180)
+# Rows removed per DELETE and the most batches one retention run may delete.
+NOTIFICATION_RETENTION_BATCH_SIZE = get_int('NOTIFICATION_RETENTION_BATCH_SIZE', 5000)
+NOTIFICATION_RETENTION_MAX_BATCHES = get_int('NOTIFICATION_RETENTION_MAX_BATCHES', 100)
+# Set once the table was converted with ``manage.py partition_notifications --convert``:
+# expired months are then dropped as whole partitions instead of deleted row by row.
+NOTIFICATION_PARTITIONED = get_bool('NOTIFICATION_PARTITIONED', False)
+NOTIFICATION_PARTITION_MONTHS_AHEAD = get_int('NOTIFICATION_PARTITION_MONTHS_AHEAD', 3)
@@ -0,0 +1,14 @@
+import os
+from GizShare.setting.funtion import get_int
+
+# Post search backend (see api/search.py). By default Elasticsearch is searched first and
+# Postgres full text search takes over while it is failing. The SQLite FTS5 backend needs
+# no cluster, but refuses to start until SEARCH_SQLITE_PATH names a database file.
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'api.search.FailoverBackend')
+SEARCH_PRIMARY_BACKEND = os.environ.get('SEARCH_PRIMARY_BACKEND', 'api.search.ElasticsearchBackend')
+SEARCH_FALLBACK_BACKEND = os.environ.get('SEARCH_FALLBACK_BACKEND', 'api.search.PostgresBackend')
+SEARCH_FAILOVER_COOLDOWN = get_int('SEARCH_FAILOVER_COOLDOWN', 30)
+SEARCH_CONFIG = os.environ.get('SEARCH_CONFIG', 'simple')
+SEARCH_SQLITE_PATH = os.environ.get('SEARCH_SQLITE_PATH')
+SEARCH_MAX_HITS = get_int('SEARCH_MAX_HITS', 1000)
+SEARCH_INDEX_CHUNK_SIZE = get_int('SEARCH_INDEX_CHUNK_SIZE', 500)
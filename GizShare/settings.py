@@ -68,6 +68,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'user',
     'api',
     'chat',
@@ -112,12 +113,6 @@ TEMPLATES = [
     },
 ]
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
-    }
-}
-
 WSGI_APPLICATION = 'GizShare.wsgi.application'
 ASGI_APPLICATION = 'GizShare.routing.application'
 
@@ -172,7 +167,9 @@ GOOGLE_CREDENTIALS_FILE = '/Users/dreamworld/Desktop/client_secret.json'
 
 ELASTICSEARCH_DSL = {
     'default': {
-        'hosts': 'http://localhost:9200'
+        'hosts': 'http://localhost:9200',
+        # Keep searches bounded while the cluster is unhealthy, see api.search.FailoverBackend.
+        'request_timeout': get_int('ELASTICSEARCH_TIMEOUT', 2),
     },
 }
 
@@ -296,6 +293,25 @@ SIMPLE_JWT = {
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 
+CELERY_BEAT_SCHEDULE = {
+    'trim-timelines': {
+        'task': 'api.tasks.trim_timelines',
+        'schedule': timedelta(hours=1),
+    },
+    'reconcile-post-counters': {
+        'task': 'api.tasks.reconcile_post_counters',
+        'schedule': timedelta(hours=1),
+    },
+    'prune-hashtag-trends': {
+        'task': 'api.tasks.prune_hashtag_trends',
+        'schedule': timedelta(hours=1),
+    },
+    'purge-notifications': {
+        'task': 'notification.tasks.purge_notifications',
+        'schedule': timedelta(hours=1),
+    },
+}
+
 # CELERY_ACCEPT_CONTENT = ['json']
 # CELERY_TASK_SERIALIZER = 'json'
 # CELERY_RESULT_SERIALIZER = 'json'
@@ -316,4 +332,16 @@ from .setting.variable import *
 
 from .setting.media import *
 
+from .setting.feed import *
+
+from .setting.cache import *
+
+from .setting.search import *
+
+from .setting.channels import *
+
+from .setting.chat import *
+
+from .setting.notification import *
+
 from .setting.debugtoolbar import *
@@ -0,0 +1,91 @@
+from django.db.models import Avg, Case, Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest
+from .models import Post, Like, PostViewer, Bookmark, Comment, Review
+from .ranking import get_ranker
+
+COUNTER_SOURCES = {
+    'like_count': Like,
+    'view_count': PostViewer,
+    'bookmark_count': Bookmark,
+    'comment_count': Comment,
+}
+
+
+def _score(weight):
+    return get_ranker().score_after(weight)
+
+
+def increment(post_id, field, delta=1):
+    """Atomically add ``delta`` to one engagement counter of a post and its weight to the score."""
+    if post_id is None or not delta:
+        return
+    Post.objects.filter(pk=post_id).update(**{
+        field: Greatest(F(field) + delta, 0),
+        'score': _score(get_ranker().event_weight(field, delta)),
+    })
+
+
+def increment_many(field, deltas):
+    """Apply ``{post_id: delta}`` to one counter with one UPDATE per distinct delta."""
+    post_ids_by_delta = {}
+    for post_id, delta in deltas.items():
+        post_ids_by_delta.setdefault(delta, []).append(post_id)
+    for delta, post_ids in post_ids_by_delta.items():
+        Post.objects.filter(pk__in=post_ids).update(**{
+            field: Greatest(F(field) + delta, 0),
+            'score': _score(get_ranker().event_weight(field, delta)),
+        })
+
+
+def rating_delta(previous, current):
+    """``(rating_delta, count_delta)`` of a review whose rating went from ``previous`` to ``current``."""
+    return (current or 0) - (previous or 0), (current is not None) - (previous is not None)
+
+
+def add_rating(post_id, rating_delta, count_delta):
+    """Adjust the rating total and review count and recompute the average in the same statement."""
+    if post_id is None or (not rating_delta and not count_delta):
+        return
+    review_count = Greatest(F('review_count') + count_delta, 0)
+    rating_total = Greatest(F('rating_total') + rating_delta, 0)
+    Post.objects.filter(pk=post_id).update(
+        review_count=review_count,
+        rating_total=rating_total,
+        score=_score(get_ranker().rating_weight(rating_delta, count_delta)),
+        avg_rating=Case(
+            When(Q(review_count__gt=-count_delta), then=Cast(rating_total, FloatField()) / review_count),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def _count_subquery(model):
+    return Coalesce(Subquery(
+        model.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(total=Count('id')).values('total')
+    ), 0)
+
+
+def reconcile(post_ids):
+    """
+    Recount the counters of the given posts from the source tables and fix any drift.
+
+    This is a single UPDATE whose SET and WHERE both read the source tables, so
+    increments that commit while it runs are never overwritten with stale values.
+    Only rows that actually drifted are written, and their score moves by the
+    engagement the drift added or took away.
+    """
+    rated = Review.objects.filter(post=OuterRef('pk'), rating__isnull=False).order_by().values('post')
+    actual = {
+        **{field: _count_subquery(model) for field, model in COUNTER_SOURCES.items()},
+        'review_count': Coalesce(Subquery(rated.annotate(total=Count('id')).values('total')), 0),
+        'rating_total': Coalesce(Subquery(rated.annotate(total=Sum('rating')).values('total')), 0),
+        'avg_rating': Coalesce(Subquery(rated.annotate(average=Avg('rating', output_field=FloatField()))
+                                        .values('average')), 0.0, output_field=FloatField()),
+    }
+    drifted = Q()
+    for field in actual:
+        drifted |= ~Q(**{field: F(f'actual_{field}')})
+    return Post.objects.filter(pk__in=post_ids) \
+        .annotate(**{f'actual_{field}': expression for field, expression in actual.items()}) \
+        .filter(drifted).update(score=get_ranker().score_recounted(actual), **actual)
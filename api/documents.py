@@ -0,0 +1,29 @@
+from django_elasticsearch_dsl import Document, fields
+from django_elasticsearch_dsl.registries import registry
+from .models import Post
+
+
+@registry.register_document
+class PostDocument(Document):
+    category = fields.TextField()
+    topic = fields.TextField()
+
+    class Index:
+        name = 'posts'
+        settings = {'number_of_shards': 1, 'number_of_replicas': 0}
+
+    class Django:
+        model = Post
+        fields = ['id', 'title', 'hashtag', 'description', 'created_at']
+        # Kept in sync by the api.tasks index tasks instead of in the request cycle.
+        ignore_signals = True
+        auto_refresh = False
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('category', 'topic')
+
+    def prepare_category(self, instance):
+        return str(instance.category) if instance.category_id else ''
+
+    def prepare_topic(self, instance):
+        return instance.topic.name or '' if instance.topic_id else ''
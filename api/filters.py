@@ -2,12 +2,7 @@ from django.db.models import Count, Q
 from django.utils import timezone
 from django_filters import rest_framework as filters
 from .models import Category, Topic, Post
-from rest_framework.filters import SearchFilter
-from elasticsearch_dsl import Q
-from django.db.models import Case, When
-from elasticsearch.exceptions import NotFoundError
-from .documents import PostDocument
-from elasticsearch_dsl.query import MultiMatch
+from .hashtags import normalize_hashtag
 
 
 class CategoryFilter(filters.FilterSet):
@@ -58,10 +53,11 @@ class PostFilter(filters.FilterSet):
     is_mine = filters.BooleanFilter(field_name='is_mine', method='filter_for_own_post', label='is_mine')
     is_followers = filters.BooleanFilter(field_name='is_followers', method='filter_for_followers_post',
                                          label='is_followers')
+    hashtag = filters.CharFilter(method='filter_by_hashtag', label='hashtag')
 
     class Meta:
         model = Post
-        fields = ['status', 'category', 'is_mine', 'is_followers']
+        fields = ['status', 'category', 'is_mine', 'is_followers', 'hashtag']
 
     def filter_for_post(self, queryset, name, value):
         following_user_ids = self.request.user.follower_user.all().values_list("following_user_id", flat=True)
@@ -70,10 +66,10 @@ class PostFilter(filters.FilterSet):
         queryset = queryset.filter(Q(user_id__in=following_user_ids) | Q(user=self.request.user))
 
         if value == 'top':
-            queryset = queryset.annotate(num_likes=Count('post_likes')).order_by('-num_likes', '-created_at')
+            queryset = queryset.order_by('-score', '-id')
 
         elif value == 'best':
-            queryset = queryset.filter(created_at__gte=days).order_by('-created_at')
+            queryset = queryset.filter(created_at__gte=days).order_by('-score', '-id')
 
         elif value == 'recent':
             queryset = queryset.order_by('-created_at')
@@ -83,33 +79,10 @@ class PostFilter(filters.FilterSet):
     def filter_for_own_post(self, queryset, name, value):
         return queryset.filter(user=self.request.user)
 
+    def filter_by_hashtag(self, queryset, name, value):
+        return queryset.filter(hashtags__name=normalize_hashtag(value))
+
     def filter_for_followers_post(self, queryset, name, value):
         following_user_ids = self.request.user.follower_user.all().values_list("following_user_id", flat=True)
         return queryset.filter(user_id__in=following_user_ids)
 
-
-class PostElasticSearchFilter(SearchFilter):
-    def get_search_fields(self, view, request):
-        return super().get_search_fields(view, request)
-
-    def filter_queryset(self, request, queryset, view):
-        query = request.query_params.get('search', None)
-        if query:
-            try:
-                search = PostDocument.search().query(
-                    MultiMatch(fields=['title', 'hashtag', 'category'], type='phrase_prefix', query=query))
-                response = search.execute()
-                hits = response.hits
-                relevant_ids = [hit.meta.id for hit in hits]
-                post = Case(
-                    *[When(id=id, then=p) for p, id in enumerate(relevant_ids)])
-                queryset = queryset.filter(id__in=relevant_ids).order_by(post)
-                return queryset
-            except NotFoundError as e:
-                print(f"NotFoundError: {e}")
-                return queryset.none()
-            except Exception as e:
-                print(f"Exception: {e}")
-                return queryset.none()
-        else:
-            return queryset
@@ -0,0 +1,73 @@
+import re
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import Hashtag, PostHashtag, HashtagTrend
+
+HASHTAG_FIELD_RE = re.compile(r'#?(\w+)')
+HASHTAG_TEXT_RE = re.compile(r'#(\w+)')
+# Post fields a save has to touch for its hashtags or their trend category to change.
+HASHTAG_SOURCE_FIELDS = {'hashtag', 'title', 'description', 'category', 'category_id'}
+
+
+def normalize_hashtag(name):
+    return name.lstrip('#').strip().lower()[:100]
+
+
+def parse_hashtags(post):
+    """
+    Hashtags of a post: every word of its ``hashtag`` field plus ``#words`` in the
+    title and description, normalized and de-duplicated in order of appearance.
+    """
+    names = HASHTAG_FIELD_RE.findall(post.hashtag or '')
+    for text in (post.title, post.description):
+        names += HASHTAG_TEXT_RE.findall(text or '')
+    return list(dict.fromkeys(filter(None, map(normalize_hashtag, names))))[:settings.HASHTAG_MAX_PER_POST]
+
+
+def sync_post_hashtags(post):
+    """Point the post's ``PostHashtag`` rows at its current hashtags and return the ids that were added."""
+    names = parse_hashtags(post)
+    Hashtag.objects.bulk_create([Hashtag(name=name) for name in names], ignore_conflicts=True)
+    hashtag_ids = set(Hashtag.objects.filter(name__in=names).values_list('id', flat=True))
+
+    current = set(PostHashtag.objects.filter(post=post).values_list('hashtag_id', flat=True))
+    if current - hashtag_ids:
+        PostHashtag.objects.filter(post=post, hashtag_id__in=current - hashtag_ids).delete()
+    added = hashtag_ids - current
+    PostHashtag.objects.bulk_create([
+        PostHashtag(post=post, hashtag_id=hashtag_id, created_at=post.created_at) for hashtag_id in added
+    ], ignore_conflicts=True)
+    return sorted(added)
+
+
+def hour_bucket(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def record_trends(hashtag_ids, category_id, tagged_at):
+    """Count one use of each hashtag in the hour bucket of ``tagged_at``."""
+    bucket = hour_bucket(tagged_at)
+    HashtagTrend.objects.bulk_create([
+        HashtagTrend(hashtag_id=hashtag_id, category_id=category_id, bucket=bucket) for hashtag_id in hashtag_ids
+    ], ignore_conflicts=True)
+    HashtagTrend.objects.filter(hashtag_id__in=hashtag_ids, category_id=category_id, bucket=bucket) \
+        .update(count=F('count') + 1)
+
+
+def trending(category_id=None, hours=None, limit=None):
+    """Top hashtags by uses over the last ``hours`` hour buckets, optionally within one category."""
+    hours = hours or settings.HASHTAG_TREND_WINDOW_HOURS
+    since = hour_bucket(timezone.now()) - timedelta(hours=hours - 1)
+    trends = HashtagTrend.objects.filter(bucket__gte=since)
+    if category_id is not None:
+        trends = trends.filter(category_id=category_id)
+    return trends.values('hashtag_id', 'hashtag__name') \
+        .annotate(total=Sum('count')) \
+        .order_by('-total', 'hashtag_id')[:limit or settings.HASHTAG_TRENDING_LIMIT]
+
+
+def prune_trends():
+    before = hour_bucket(timezone.now()) - timedelta(hours=settings.HASHTAG_TREND_RETENTION_HOURS)
+    return HashtagTrend.objects.filter(bucket__lt=before).delete()[0]
@@ -0,0 +1,114 @@
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+from .models import PostImage
+
+ORIENTATION = 0x0112
+
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+def variant_path(post_image, width, extension):
+    return 'post_image/variants/{}/{}w.{}'.format(post_image.pk, width, extension)
+
+
+def variant_widths(original_width):
+    """The configured widths below the original one, or just the original width for small images."""
+    widths = sorted(width for width in settings.POST_IMAGE_VARIANT_WIDTHS if width < original_width)
+    return widths or [original_width]
+
+
+def _for_format(image, image_format):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+    if image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    return image
+
+
+def encode(image, image_format):
+    """Encode ``image`` without its EXIF block (camera data, GPS position)."""
+    buffer = BytesIO()
+    options = {'quality': settings.POST_IMAGE_VARIANT_QUALITY}
+    if image_format == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    else:
+        options.update(method=4)
+    if image.info.get('icc_profile'):
+        options['icc_profile'] = image.info['icc_profile']
+    _for_format(image, image_format).save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def generate_variants(post_image):
+    """
+    Resize one post image to every configured width and format, store the copies
+    next to each other and record them with the original size on the row.
+    """
+    storage = post_image.image.storage
+    with post_image.image.open('rb') as file:
+        image = Image.open(file)
+        # Sizes are of the upright image; EXIF orientations 5-8 swap the stored axes.
+        rotated = image.getexif().get(ORIENTATION, 1) in (5, 6, 7, 8)
+        width, height = image.size[::-1] if rotated else image.size
+        widths = variant_widths(width)
+        # Let the JPEG decoder downscale while decoding when the largest copy is much smaller.
+        target = (widths[-1], max(1, height * widths[-1] // width))
+        image.draft(None, target[::-1] if rotated else target)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    variants = {}
+    for name in settings.POST_IMAGE_VARIANT_FORMATS:
+        image_format, extension = FORMATS[name]
+        variants[name] = []
+        for variant_width in widths:
+            variant_height = max(1, round(height * variant_width / width))
+            resized = image if image.size == (variant_width, variant_height) else \
+                image.resize((variant_width, variant_height), Image.Resampling.LANCZOS)
+            path = variant_path(post_image, variant_width, extension)
+            if storage.exists(path):
+                storage.delete(path)
+            path = storage.save(path, ContentFile(encode(resized, image_format)))
+            variants[name].append({'width': variant_width, 'height': variant_height, 'path': path})
+
+    _delete_stale(storage, post_image.variants, variants)
+    PostImage.objects.filter(pk=post_image.pk).update(width=width, height=height, variants=variants)
+    post_image.width, post_image.height, post_image.variants = width, height, variants
+    return variants
+
+
+def _delete_stale(storage, old, new):
+    kept = {variant['path'] for variants in new.values() for variant in variants}
+    for variants in (old or {}).values():
+        for variant in variants:
+            if variant['path'] not in kept:
+                storage.delete(variant['path'])
+
+
+def srcset(variants, build_url):
+    """``{format: 'url 320w, url 640w'}`` for the recorded variants."""
+    return {
+        name: ', '.join('{} {}w'.format(build_url(variant['path']), variant['width']) for variant in items)
+        for name, items in (variants or {}).items()
+    }
+
+
+def process_post_images(post_image_ids):
+    processed = 0
+    for post_image in PostImage.objects.filter(id__in=post_image_ids):
+        try:
+            generate_variants(post_image)
+            processed += 1
+        except Exception as e:
+            print(f"Error generating variants of post image {post_image.pk}: {e}")
+    return processed
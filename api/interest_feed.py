@@ -0,0 +1,142 @@
+import bisect
+import threading
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from .models import Post, InterestedTopic, InterestedCategory
+from .search import offset_position
+from .utils import chunked
+
+
+# Marks a complete feed in its Redis sorted set; ranked above every post, never paged.
+BUILT = ''
+_local_lock = threading.Lock()
+
+
+def feed_key(user_id):
+    return 'interest_feed:%s' % user_id
+
+
+def _redis():
+    """The Redis client behind the default cache, or ``None`` for a per-process cache."""
+    backend = caches['default']
+    return backend._cache.get_client(write=True) if isinstance(backend, RedisCache) else None
+
+
+def _member(post_id):
+    # Zero padded so Redis' lexicographic tie-break on equal scores follows the post id.
+    return '%015d' % post_id
+
+
+def score(created_at, topic_match):
+    """Recency in hours, with matches on an interested topic ranked as if they were newer."""
+    hours = created_at.timestamp() / 3600
+    return hours + settings.INTEREST_TOPIC_BOOST_HOURS if topic_match else hours
+
+
+def build_feed(user_id):
+    """
+    Collect the newest posts in the user's interested topics and categories, one
+    index-backed query per source, and rank them. Returns ``[[post_id, score], ...]``.
+    """
+    size = settings.INTEREST_FEED_SIZE
+    topic_ids = list(InterestedTopic.objects.filter(user_id=user_id).values_list('topic_id', flat=True))
+    category_ids = list(InterestedCategory.objects.filter(user_id=user_id).values_list('category_id', flat=True))
+    scores = {}
+    for source, ids, topic_match in (('topic_id', topic_ids, True), ('category_id', category_ids, False)):
+        if not ids:
+            continue
+        posts = Post.objects.filter(**{f'{source}__in': ids}).exclude(user_id=user_id) \
+            .order_by('-created_at', '-id').values_list('id', 'created_at')[:size]
+        for post_id, created_at in posts:
+            scores[post_id] = max(scores.get(post_id, 0), score(created_at, topic_match))
+    return rank(scores.items())
+
+
+def rank(candidates):
+    ranked = sorted(candidates, key=lambda candidate: (-candidate[1], -candidate[0]))
+    return [list(candidate) for candidate in ranked[:settings.INTEREST_FEED_SIZE]]
+
+
+def get_feed(user_id):
+    """
+    The user's ranked ``[[post_id, score], ...]``. With a Redis cache the feed is a
+    sorted set shared by every process, so posts merged in by ``push_post`` are seen
+    everywhere; otherwise it is a list in this process' cache.
+    """
+    client = _redis()
+    if client is None:
+        feed = cache.get(feed_key(user_id))
+        if feed is None:
+            feed = build_feed(user_id)
+            cache.set(feed_key(user_id), feed, settings.INTEREST_FEED_TTL)
+        return feed
+
+    key = cache.make_key(feed_key(user_id))
+    members = client.zrevrange(key, 0, -1, withscores=True)
+    if members and members[0][0] == BUILT.encode():
+        return [[int(member), value] for member, value in members[1:]]
+    # Missing, expired or only holding posts pushed since it expired.
+    feed = build_feed(user_id)
+    pipe = client.pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.zadd(key, {BUILT: float('inf'), **{_member(post_id): value for post_id, value in feed}})
+    pipe.expire(key, settings.INTEREST_FEED_TTL)
+    pipe.execute()
+    return feed
+
+
+def feed_page(user_id, position, size):
+    """
+    Page through the cached feed: ``(hits, next_position)``, see ``SearchBackend.search_page``.
+    Positions are ``[score, post_id]`` keys, so a feed rebuilt between two pages
+    neither repeats nor skips the posts around the cursor.
+    """
+    feed = get_feed(user_id)
+    if isinstance(position, list):
+        start = bisect.bisect_right(feed, (-position[0], -position[1]), key=lambda item: (-item[1], -item[0]))
+    else:
+        start = offset_position(position)
+    hits = [(post_id, [value, post_id]) for post_id, value in feed[start:start + size]]
+    return hits, hits[-1][1] if len(feed) > start + size else None
+
+
+def invalidate_feed(user_id):
+    cache.delete(feed_key(user_id))
+
+
+def push_post(post):
+    """
+    Merge a new post into the cached feeds of users interested in its topic or
+    category, keeping each feed in ``[score, id]`` order and at INTEREST_FEED_SIZE.
+    In Redis every merge is one MULTI of ZADD and a trim, so concurrent pushes and
+    reads never lose a post; a per-process cache only updates this process' feeds.
+    """
+    topic_users = set(InterestedTopic.objects.filter(topic_id=post.topic_id).values_list('user_id', flat=True)) \
+        if post.topic_id else set()
+    category_users = set(InterestedCategory.objects.filter(category_id=post.category_id)
+                         .values_list('user_id', flat=True)) if post.category_id else set()
+    user_ids = (topic_users | category_users) - {post.user_id}
+    scores = {True: score(post.created_at, True), False: score(post.created_at, False)}
+
+    client = _redis()
+    for chunk in chunked(user_ids, 1000):
+        if client is None:
+            with _local_lock:
+                for user_id in chunk:
+                    feed = cache.get(feed_key(user_id))
+                    if feed is not None:
+                        candidates = [item for item in feed if item[0] != post.id]
+                        candidates.append([post.id, scores[user_id in topic_users]])
+                        cache.set(feed_key(user_id), rank(candidates), settings.INTEREST_FEED_TTL)
+            continue
+        pipe = client.pipeline(transaction=True)
+        for user_id in chunk:
+            key = cache.make_key(feed_key(user_id))
+            pipe.zadd(key, {_member(post.id): scores[user_id in topic_users]})
+            # Keep the marker and the best INTEREST_FEED_SIZE posts.
+            pipe.zremrangebyrank(key, 0, -(settings.INTEREST_FEED_SIZE + 2))
+            # A feed that was not cached only holds this post; give it a lifetime, ``get_feed`` rebuilds it.
+            pipe.expire(key, settings.INTEREST_FEED_TTL, nx=True)
+        pipe.execute()
+    return len(user_ids)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from api.images import process_post_images
+from api.models import PostImage
+from api.utils import chunked
+
+
+class Command(BaseCommand):
+    help = 'Generate the resized WebP/JPEG variants of post images that do not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=100, help='Images loaded per batch.')
+        parser.add_argument('--all', action='store_true', help='Regenerate the variants of every image.')
+
+    def handle(self, *args, **options):
+        post_images = PostImage.objects.order_by('id')
+        if not options['all']:
+            post_images = post_images.filter(variants={})
+        ids = post_images.values_list('id', flat=True).iterator(chunk_size=options['chunk_size'])
+        total = 0
+        for chunk in chunked(ids, options['chunk_size']):
+            total += process_post_images(chunk)
+            self.stdout.write(f'Processed {total} images')
+        self.stdout.write(self.style.SUCCESS(f'Generated the variants of {total} post images.'))
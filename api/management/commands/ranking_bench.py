@@ -0,0 +1,47 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Avg, Count, F, FloatField, ExpressionWrapper
+from django.utils import timezone
+from api.models import Post
+
+
+class Command(BaseCommand):
+    help = ("Compare the latency of the 'top' and 'best' post queries: request-time annotate/aggregate "
+            "against the stored, indexed Post.score.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Timed runs per query.')
+        parser.add_argument('--limit', type=int, default=20, help='Page size of every query.')
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        day_ago = timezone.now() - timezone.timedelta(hours=24)
+        engagement = ExpressionWrapper(
+            Count('post_likes', distinct=True) + Count('post_viewers', distinct=True) * 0.1 +
+            Count('comment', distinct=True) * 2 + Count('post_bookmark', distinct=True) * 1.5,
+            output_field=FloatField(),
+        )
+        queries = {
+            'top (annotate)': lambda: Post.objects.annotate(total_likes=Count('post_likes'))
+            .order_by('-total_likes', '-created_at')[:limit],
+            'best (annotate)': lambda: Post.objects.filter(created_at__gte=day_ago)
+            .annotate(engagement=engagement, rating=Avg('review__rating'))
+            .order_by(F('engagement').desc(), F('rating').desc(nulls_last=True), '-id')[:limit],
+            'top (score)': lambda: Post.objects.order_by('-score', '-id')[:limit],
+            'best (score)': lambda: Post.objects.filter(created_at__gte=day_ago).order_by('-score', '-id')[:limit],
+        }
+
+        self.stdout.write(f'{Post.objects.count()} posts, {options["iterations"]} runs per query, '
+                          f'page size {limit} ({connection.vendor})')
+        for name, query in queries.items():
+            list(query())
+            timings = []
+            for _ in range(options['iterations']):
+                started = time.perf_counter()
+                list(query())
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(f'{name:<18} p50 {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms')
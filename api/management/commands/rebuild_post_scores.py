@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from api.ranking import rebuild_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute every post ranking score from its engagement counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Posts updated per bulk_update.')
+
+    def handle(self, *args, **options):
+        total = rebuild_scores(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the score of {total} posts.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from user.models import User
+from api.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed home timelines from the follower graph.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only rebuild the timeline of this user id (repeatable).')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True).values_list('id', flat=True)
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+
+        total = 0
+        for user_id in users.iterator():
+            rebuild_timeline(user_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} timelines.'))
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.models import Post
+from api.search import get_search_backend
+from api.utils import chunked
+
+
+class Command(BaseCommand):
+    help = 'Stream every post into the search index in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=settings.SEARCH_INDEX_CHUNK_SIZE,
+                            help='Posts loaded and indexed per batch.')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Drop and recreate the index before indexing.')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if options['rebuild']:
+            backend.rebuild()
+
+        chunk_size = options['chunk_size']
+        posts = Post.objects.select_related('category', 'topic').order_by('id').iterator(chunk_size=chunk_size)
+        total = 0
+        for chunk in chunked(posts, chunk_size):
+            backend.index(chunk)
+            total += len(chunk)
+            self.stdout.write(f'Indexed {total} posts')
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {total} posts.'))
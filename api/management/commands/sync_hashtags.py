@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from api.hashtags import sync_post_hashtags
+from api.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Parse the hashtags of every existing post into the Hashtag table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Posts loaded per query.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.only('id', 'title', 'hashtag', 'description', 'created_at') \
+            .order_by('id').iterator(chunk_size=options['chunk_size'])
+        total = 0
+        for post in posts:
+            sync_post_hashtags(post)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f'Synced hashtags of {total} posts.'))
@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from user.models import User
 from django.utils import timezone
@@ -82,6 +84,25 @@ class Post(TimeAt):
     hashtag = models.CharField(max_length=120)
     description = models.TextField(null=True, blank=True)
     price = models.IntegerField(null=True, blank=True)
+    like_count = models.PositiveIntegerField(default=0)
+    view_count = models.PositiveIntegerField(default=0)
+    bookmark_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    avg_rating = models.FloatField(default=0)
+    score = models.FloatField(default=0)
+    search_vector = SearchVectorField(null=True, editable=False)
+    hashtags = models.ManyToManyField('Hashtag', through='PostHashtag', related_name='posts', blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='api_post_created_idx'),
+            models.Index(fields=['-score', '-id'], name='api_post_score_idx'),
+            models.Index(fields=['topic', '-created_at', '-id'], name='api_post_topic_created_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='api_post_category_created_idx'),
+            GinIndex(fields=['search_vector'], name='api_post_search_idx'),
+        ]
 
     def __str__(self):
         return '{} '.format(self.pk)
@@ -90,6 +111,10 @@ class Post(TimeAt):
 class PostImage(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='images')
     image = models.FileField(upload_to="post_image", validators=[validate_image])
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    # ``{format: [{'width': .., 'height': .., 'path': ..}]}`` of the resized copies, smallest first.
+    variants = models.JSONField(default=dict, blank=True)
 
 
 class PostViewer(TimeAt):
@@ -104,6 +129,11 @@ class Like(TimeAt):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='post_likes')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created_at'], name='api_like_post_created_idx'),
+        ]
+
     def __str__(self):
         return '{} '.format(self.pk)
 
@@ -114,6 +144,11 @@ class Comment(TimeAt):
     parent_comment = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
     content = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='api_comment_created_idx'),
+        ]
+
     def __str__(self):
         return '{} '.format(self.pk)
 
@@ -136,6 +171,76 @@ class Follower(TimeAt):
         return '{} '.format(self.user)
 
 
+class Hashtag(models.Model):
+    """A normalized hashtag: lower case, without the leading ``#``."""
+    name = models.CharField(max_length=100, unique=True)
+    created_at = models.DateTimeField(verbose_name="Created At", default=timezone.now)
+
+    def __str__(self):
+        return '#{}'.format(self.name)
+
+
+class PostHashtag(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='post_hashtags')
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='post_hashtags')
+    created_at = models.DateTimeField(verbose_name="Created At", default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'hashtag'], name='api_post_hashtag_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['hashtag', '-created_at'], name='api_post_hashtag_created_idx'),
+        ]
+
+    def __str__(self):
+        return '{} '.format(self.pk)
+
+
+class HashtagTrend(models.Model):
+    """Number of posts tagged with a hashtag in one category during one hour."""
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='trends')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    bucket = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # NULLs never conflict in a plain unique constraint, so uncategorised rows get their own.
+        constraints = [
+            models.UniqueConstraint(fields=['hashtag', 'category', 'bucket'],
+                                    condition=models.Q(category__isnull=False), name='api_hashtag_trend_uniq'),
+            models.UniqueConstraint(fields=['hashtag', 'bucket'], condition=models.Q(category__isnull=True),
+                                    name='api_hashtag_trend_uncategorised_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['category', 'bucket'], name='api_hashtag_trend_category_idx'),
+            models.Index(fields=['bucket'], name='api_hashtag_trend_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return '{} '.format(self.pk)
+
+
+class TimelineEntry(models.Model):
+    """A post pushed into a user's precomputed home timeline."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(verbose_name="Created At")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='api_timeline_user_post_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='api_timeline_user_created_idx'),
+            models.Index(fields=['user', 'author'], name='api_timeline_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return '{} '.format(self.pk)
+
+
 class Bookmark(TimeAt):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='post_bookmark', null=True, blank=True)
@@ -158,6 +263,11 @@ class Review(TimeAt):
     rating = models.IntegerField(choices=ReviewType.choices, help_text=ReviewType.choices, null=True)
     content = models.TextField(max_length=500)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='api_review_created_idx'),
+        ]
+
     def __str__(self):
         return '{} '.format(self.pk)
 
@@ -0,0 +1,130 @@
+import math
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Ln
+from django.utils.module_loading import import_string
+from .models import Post
+from .utils import chunked
+
+# Zero point of the time part of every score. Changing it shifts all scores alike.
+SCORE_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+# Engagement is floored here before taking its logarithm.
+MIN_ENGAGEMENT = 0.01
+
+
+class Ranker:
+    """
+    Turns engagement into the stored ``Post.score``.
+
+    Scores are fixed-epoch log-time values: ``log2(engagement)`` plus
+    ``time_score(created_at)``, the post's creation time counted from
+    ``SCORE_EPOCH``. Comparing two scores compares their engagement decayed by
+    age, yet a stored score never changes as time passes, so nothing has to
+    rewrite rows periodically. Engagement events move the score in the same
+    ``UPDATE`` as their counter. Subclasses choose the weights and the time scale.
+    """
+    weights = {}
+
+    def initial_engagement(self):
+        return 0.0
+
+    def event_weight(self, field, delta):
+        return self.weights.get(field, 0.0) * delta
+
+    def rating_weight(self, rating_delta, count_delta):
+        return 0.0
+
+    def time_score(self, created_at):
+        return 0.0
+
+    def engagement(self, post):
+        """Engagement of a post from its counters."""
+        engagement = self.initial_engagement() + self.rating_weight(post.rating_total, post.review_count)
+        return engagement + sum(self.event_weight(field, getattr(post, field)) for field in self.weights)
+
+    def engagement_expression(self, counters=None):
+        """
+        ``engagement`` as an SQL expression over the counter columns of the row, or
+        over the expressions given per counter field in ``counters``.
+        """
+        counters = {field: F(field) for field in ('rating_total', 'review_count', *self.weights)} | (counters or {})
+        engagement = Value(float(self.initial_engagement())) + \
+            self.rating_weight(counters['rating_total'], counters['review_count'])
+        return engagement + sum(self.event_weight(field, counters[field]) for field in self.weights)
+
+    def score(self, post):
+        """Score of a post computed from its counters."""
+        return math.log2(max(self.engagement(post), MIN_ENGAGEMENT)) + self.time_score(post.created_at)
+
+    def score_after(self, weight):
+        """
+        SQL expression for the score once ``weight`` is added to the engagement. It
+        reads the counters of the row being updated, so it belongs in the same
+        ``UPDATE`` as the counter change.
+        """
+        if not weight:
+            return F('score')
+        engagement = self.engagement_expression()
+        return F('score') + (_log2(engagement + Value(float(weight))) - _log2(engagement))
+
+    def score_recounted(self, counters):
+        """
+        SQL expression for the score once the row's counters are replaced by the
+        expressions in ``counters``, for an ``UPDATE`` that sets both.
+        """
+        return F('score') + (_log2(self.engagement_expression(counters)) - _log2(self.engagement_expression()))
+
+
+def _log2(expression):
+    return Ln(Greatest(expression, Value(MIN_ENGAGEMENT))) / Value(math.log(2))
+
+
+class DecayedEngagementRanker(Ranker):
+    """
+    Likes, views, comments and bookmarks, plus reviews above or below three stars,
+    halving in weight every ``POST_SCORE_HALF_LIFE_HOURS`` of age.
+    """
+    weights = {
+        'like_count': 1.0,
+        'view_count': 0.1,
+        'comment_count': 2.0,
+        'bookmark_count': 1.5,
+    }
+    star_weight = 0.5
+    neutral_rating = 3
+
+    def initial_engagement(self):
+        return float(settings.POST_SCORE_NEW_POST)
+
+    def rating_weight(self, rating_delta, count_delta):
+        return self.star_weight * (rating_delta - self.neutral_rating * count_delta)
+
+    def time_score(self, created_at):
+        # One point per half-life: a post twice as engaging as one a half-life newer ranks level with it.
+        return (created_at - SCORE_EPOCH).total_seconds() / (settings.POST_SCORE_HALF_LIFE_HOURS * 3600)
+
+
+_ranker = None
+
+
+def get_ranker():
+    global _ranker
+    if _ranker is None:
+        _ranker = import_string(settings.POST_RANKER)()
+    return _ranker
+
+
+def rebuild_scores(post_ids=None, chunk_size=1000):
+    """Recompute scores from the counters, e.g. after changing the ranker or its weights."""
+    ranker = get_ranker()
+    posts = Post.objects.only('id', 'created_at', 'score', 'rating_total', 'review_count', *ranker.weights)
+    if post_ids is not None:
+        posts = posts.filter(id__in=post_ids)
+    total = 0
+    for chunk in chunked(posts.order_by('id').iterator(chunk_size=chunk_size), chunk_size):
+        for post in chunk:
+            post.score = ranker.score(post)
+        Post.objects.bulk_update(chunk, ['score'])
+        total += len(chunk)
+    return total
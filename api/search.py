@@ -0,0 +1,280 @@
+import re
+import sqlite3
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F
+from django.utils.module_loading import import_string
+from GizShare.pagination import InvalidCursor
+
+SEARCH_FIELDS = ['title', 'hashtag', 'category', 'topic', 'description']
+
+
+def post_document(post):
+    """Flatten a post (with ``category`` and ``topic`` selected) into its searchable text."""
+    return {
+        'title': post.title or '',
+        'hashtag': post.hashtag or '',
+        'category': str(post.category) if post.category_id else '',
+        'topic': post.topic.name or '' if post.topic_id else '',
+        'description': post.description or '',
+    }
+
+
+def post_search_vector():
+    config = settings.SEARCH_CONFIG
+    return SearchVector('title', weight='A', config=config) + \
+        SearchVector('hashtag', weight='A', config=config) + \
+        SearchVector('description', weight='B', config=config)
+
+
+def update_post_search_vectors(post_ids):
+    """Recompute the stored ``search_vector`` of the given posts in one ``UPDATE`` (PostgreSQL only)."""
+    from .models import Post
+    if connection.vendor == 'postgresql':
+        Post.objects.filter(id__in=post_ids).update(search_vector=post_search_vector())
+
+
+def prefix_search_query(text):
+    """Turn free text into a ranked-search tsquery matching every word as a prefix, or ``None``."""
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    return SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config=settings.SEARCH_CONFIG)
+
+
+def offset_position(position):
+    """The offset a position resumes from; ``search_after`` keys only mean something to Elasticsearch."""
+    if position is None:
+        return 0
+    if isinstance(position, int) and not isinstance(position, bool) and position >= 0:
+        return position
+    raise InvalidCursor('This search can no longer be resumed from that cursor.')
+
+
+class SearchBackend:
+    """
+    Interface of a post search index. ``search`` returns post ids, best match first.
+    """
+
+    def index(self, posts):
+        raise NotImplementedError
+
+    def delete(self, post_ids):
+        raise NotImplementedError
+
+    def search(self, query, offset=0, limit=None):
+        raise NotImplementedError
+
+    def search_page(self, query, position=None, size=20):
+        """
+        Return ``(hits, next_position)`` for one page: ``hits`` are ``(post_id, position)``
+        pairs, the position resuming right after that hit. ``position`` is one of those
+        values; ``next_position`` resumes after the page and is ``None`` on the last one.
+        """
+        offset = offset_position(position)
+        post_ids = self.search(query, offset, size + 1)
+        hits = [(post_id, offset + index + 1) for index, post_id in enumerate(post_ids[:size])]
+        return hits, offset + size if len(post_ids) > size else None
+
+    def rebuild(self):
+        """Drop and recreate an empty index."""
+        raise NotImplementedError
+
+
+class ElasticsearchBackend(SearchBackend):
+
+    @property
+    def document(self):
+        from .documents import PostDocument
+        return PostDocument
+
+    def index(self, posts):
+        self.document().update(posts)
+
+    def delete(self, post_ids):
+        from elasticsearch.helpers import bulk
+        document = self.document
+        bulk(document._get_connection(), (
+            {'_op_type': 'delete', '_index': document._index._name, '_id': post_id} for post_id in post_ids
+        ), raise_on_error=False)
+
+    def search(self, query, offset=0, limit=None):
+        limit = limit or settings.SEARCH_MAX_HITS
+        search = self.document.search() \
+            .query('multi_match', fields=SEARCH_FIELDS, type='phrase_prefix', query=query) \
+            .source(False)[offset:offset + limit]
+        return [int(hit.meta.id) for hit in search.execute()]
+
+    def search_page(self, query, position=None, size=20):
+        """Pages are keyed with ``search_after`` on ``(_score, id)``, so deep pages cost no more than the first."""
+        search = self.document.search() \
+            .query('multi_match', fields=SEARCH_FIELDS, type='phrase_prefix', query=query) \
+            .sort('_score', {'id': 'desc'}) \
+            .extra(size=size + 1) \
+            .source(False)
+        if isinstance(position, list):
+            search = search.extra(search_after=position)
+        elif isinstance(position, int) and position > 0:
+            # An offset handed out by the fallback backend during an outage.
+            search = search.extra(from_=position)
+        hits = [(int(hit.meta.id), list(hit.meta.sort)) for hit in search.execute()]
+        return hits[:size], hits[size - 1][1] if len(hits) > size else None
+
+    def rebuild(self):
+        self.document._index.delete(ignore_unavailable=True)
+        self.document.init()
+
+
+class PostgresBackend(SearchBackend):
+    """
+    Ranked full text search over the GIN-indexed ``Post.search_vector``, which the
+    post signals keep current. Needs no service besides the database itself.
+    """
+
+    def index(self, posts):
+        update_post_search_vectors([post.id for post in posts])
+
+    def delete(self, post_ids):
+        pass
+
+    def search(self, query, offset=0, limit=None):
+        from .models import Post
+        search_query = prefix_search_query(query)
+        if search_query is None:
+            return []
+        limit = limit or settings.SEARCH_MAX_HITS
+        return list(Post.objects.filter(search_vector=search_query)
+                    .annotate(rank=SearchRank(F('search_vector'), search_query))
+                    .order_by('-rank', '-id')
+                    .values_list('id', flat=True)[offset:offset + limit])
+
+    def rebuild(self):
+        pass
+
+
+class FailoverBackend(SearchBackend):
+    """
+    Searches the primary backend and falls back to the secondary one when it fails.
+
+    After a failure the primary is skipped for ``cooldown`` seconds (a simple circuit
+    breaker), so an outage costs one timed-out request per cooldown instead of one
+    per search. Index updates go to both backends.
+    """
+
+    def __init__(self, primary=None, fallback=None, cooldown=None):
+        self.primary = primary or import_string(settings.SEARCH_PRIMARY_BACKEND)()
+        self.fallback = fallback or import_string(settings.SEARCH_FALLBACK_BACKEND)()
+        self.cooldown = settings.SEARCH_FAILOVER_COOLDOWN if cooldown is None else cooldown
+        self._failed_at = None
+
+    def is_open(self):
+        return self._failed_at is not None and time.monotonic() - self._failed_at < self.cooldown
+
+    def search(self, query, offset=0, limit=None):
+        if not self.is_open():
+            try:
+                post_ids = self.primary.search(query, offset, limit)
+                self._failed_at = None
+                return post_ids
+            except Exception as e:
+                print(f"Primary search backend failed, failing over for {self.cooldown}s: {e}")
+                self._failed_at = time.monotonic()
+        return self.fallback.search(query, offset, limit)
+
+    def search_page(self, query, position=None, size=20):
+        if not self.is_open():
+            try:
+                page = self.primary.search_page(query, position, size)
+                self._failed_at = None
+                return page
+            except InvalidCursor:
+                raise
+            except Exception as e:
+                print(f"Primary search backend failed, failing over for {self.cooldown}s: {e}")
+                self._failed_at = time.monotonic()
+        return self.fallback.search_page(query, position, size)
+
+    def index(self, posts):
+        self._each('index', posts)
+
+    def delete(self, post_ids):
+        self._each('delete', post_ids)
+
+    def rebuild(self):
+        self._each('rebuild')
+
+    def _each(self, method, *args):
+        error = None
+        for backend in (self.primary, self.fallback):
+            try:
+                getattr(backend, method)(*args)
+            except Exception as e:
+                print(f"Search backend {type(backend).__name__}.{method} failed: {e}")
+                error = error or e
+        if error is not None:
+            raise error
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    SQLite FTS5 index, for development and tests without an Elasticsearch cluster.
+    Matches the query as a phrase prefix and ranks by bm25. The index lives in the
+    SEARCH_SQLITE_PATH file so every process sees the same posts; an in-memory
+    database is only accepted when passed in directly, as tests do.
+    """
+
+    def __init__(self, path=None):
+        if path is None and settings.SEARCH_SQLITE_PATH in (None, '', ':memory:'):
+            raise ImproperlyConfigured(
+                'SQLiteFTSBackend needs SEARCH_SQLITE_PATH set to a database file shared by every process.')
+        self.path = path or settings.SEARCH_SQLITE_PATH
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._create()
+
+    def _create(self):
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS post_search USING fts5({})'.format(', '.join(SEARCH_FIELDS)))
+
+    def index(self, posts):
+        rows = [(post.id, *post_document(post).values()) for post in posts]
+        with self._lock, self._connection:
+            self._connection.executemany('DELETE FROM post_search WHERE rowid = ?', [(row[0],) for row in rows])
+            self._connection.executemany(
+                'INSERT INTO post_search (rowid, {}) VALUES (?, {})'.format(
+                    ', '.join(SEARCH_FIELDS), ', '.join('?' * len(SEARCH_FIELDS))), rows)
+
+    def delete(self, post_ids):
+        with self._lock, self._connection:
+            self._connection.executemany('DELETE FROM post_search WHERE rowid = ?', [(post_id,) for post_id in post_ids])
+
+    def search(self, query, offset=0, limit=None):
+        query = ' '.join(query.split())
+        if not query:
+            return []
+        match = '"{}" *'.format(query.replace('"', '""'))
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT rowid FROM post_search WHERE post_search MATCH ? ORDER BY rank LIMIT ? OFFSET ?',
+                (match, limit or settings.SEARCH_MAX_HITS, offset)).fetchall()
+        return [row[0] for row in rows]
+
+    def rebuild(self):
+        with self._lock, self._connection:
+            self._connection.execute('DROP TABLE IF EXISTS post_search')
+        self._create()
+
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.SEARCH_BACKEND)()
+    return _backend
@@ -4,8 +4,13 @@ from .models import (Category, InterestedCategory, Topic, InterestedTopic, Custo
                      Address, Order, PostImage, Download)
 from user.models import User, DeviceDetails
 from rest_framework.exceptions import ValidationError
-from notification.genrator import follow_notification
-from .tasks import send_post_notification_email
+from notification.genrator import follow_notification, like_notification
+from notification.tasks import send_new_post_notifications
+from .tasks import (send_post_notification_email, fan_out_post_to_timelines, backfill_follower_timeline,
+                    push_post_to_interest_feeds, generate_post_image_variants)
+from .interest_feed import invalidate_feed
+from .images import srcset
+from . import counters
 import django
 
 
@@ -15,6 +20,7 @@ class InterestedCategoryBulkCreateSerializer(serializers.ListSerializer):
             instances = [InterestedCategory(**item) for item in validated_data]
             InterestedCategory.objects.filter(user=self.context['request'].user).delete()
             created_instances = InterestedCategory.objects.bulk_create(instances)
+        invalidate_feed(self.context['request'].user.id)
         return created_instances
 
 
@@ -50,6 +56,7 @@ class InterestedTopicBulkCreateSerializer(serializers.ListSerializer):
             instances = [InterestedTopic(**item) for item in validated_data]
             InterestedTopic.objects.filter(user=self.context['request'].user).delete()
             created_instances = InterestedTopic.objects.bulk_create(instances)
+        invalidate_feed(self.context['request'].user.id)
         return created_instances
 
 
@@ -65,9 +72,28 @@ class InterestedTopicSerializer(serializers.ModelSerializer):
 
 
 class PostImageSerializers(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = PostImage
-        fields = "__all__"
+        fields = ['id', 'post', 'image', 'width', 'height', 'variants', 'srcset']
+
+    def build_url(self, path):
+        url = PostImage._meta.get_field('image').storage.url(path)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def get_variants(self, obj):
+        """``{format: [{'url', 'width', 'height'}]}``, smallest first; empty until the variants are generated."""
+        return {
+            name: [{'url': self.build_url(variant['path']), 'width': variant['width'], 'height': variant['height']}
+                   for variant in items]
+            for name, items in (obj.variants or {}).items()
+        }
+
+    def get_srcset(self, obj):
+        return srcset(obj.variants, self.build_url)
 
 
 class PostSerializer(serializers.ModelSerializer):
@@ -76,17 +102,23 @@ class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = ['id', 'user', 'category', 'topic', 'hashtag', 'description', 'price',  'images',
-                  'images']
+                  'images', 'like_count', 'view_count', 'bookmark_count', 'comment_count', 'avg_rating', 'score']
+        read_only_fields = ['like_count', 'view_count', 'bookmark_count', 'comment_count', 'avg_rating', 'score']
 
     def create(self, validated_data):
         uploaded_images = validated_data.pop("images")
         post = Post.objects.create(**validated_data)
 
-        send_post_notification_email.delay(post.id)
-
-        PostImage.objects.bulk_create([
+        post_images = PostImage.objects.bulk_create([
             PostImage(post=post, image=image) for image in uploaded_images
         ])
+        if post_images:
+            generate_post_image_variants.delay([post_image.id for post_image in post_images])
+
+        send_post_notification_email.delay(post.id)
+        fan_out_post_to_timelines.delay(post.id)
+        push_post_to_interest_feeds.delay(post.id)
+        send_new_post_notifications.delay(post.id)
 
         return post
 
@@ -104,6 +136,11 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'user', 'post', 'parent_comment', 'content']
 
+    def create(self, validated_data):
+        instance = super(CommentSerializer, self).create(validated_data)
+        counters.increment(instance.post_id, 'comment_count', 1)
+        return instance
+
 
 class LikeSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
@@ -121,6 +158,12 @@ class LikeSerializer(serializers.ModelSerializer):
 
         return data
 
+    def create(self, validated_data):
+        instance = super(LikeSerializer, self).create(validated_data)
+        counters.increment(instance.post_id, 'like_count', 1)
+        like_notification(instance)
+        return instance
+
 
 class CommentLikeSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
@@ -140,6 +183,7 @@ class FollowSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         instance = super(FollowSerializer, self).create(validated_data)
         follow_notification(instance)
+        backfill_follower_timeline.delay(instance.user_id, instance.following_user_id)
         return instance
 
 
@@ -169,6 +213,22 @@ class PostViewSerializer(serializers.ModelSerializer):
         model = PostViewer
         fields = ['id', 'user', 'post', 'view_count']
 
+    def create(self, validated_data):
+        instance = super(PostViewSerializer, self).create(validated_data)
+        counters.increment(instance.post_id, 'view_count', 1)
+        return instance
+
+
+class TrendingHashtagSerializer(serializers.Serializer):
+    id = serializers.IntegerField(source='hashtag_id')
+    name = serializers.CharField(source='hashtag__name')
+    count = serializers.IntegerField(source='total')
+
+
+class PostViewEventSerializer(serializers.Serializer):
+    """Validates a buffered post view without looking the post up."""
+    post = serializers.IntegerField(min_value=1)
+
 
 class BookMarkSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
@@ -178,6 +238,11 @@ class BookMarkSerializer(serializers.ModelSerializer):
         model = Bookmark
         fields = ['id', 'user', 'post', 'count']
 
+    def create(self, validated_data):
+        instance = super(BookMarkSerializer, self).create(validated_data)
+        counters.increment(instance.post_id, 'bookmark_count', 1)
+        return instance
+
 
 class ReviewSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
@@ -187,6 +252,20 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         fields = ['id', 'user', 'post', 'rating', 'content', 'average_rating']
 
+    def create(self, validated_data):
+        instance = super(ReviewSerializer, self).create(validated_data)
+        counters.add_rating(instance.post_id, *counters.rating_delta(None, instance.rating))
+        return instance
+
+    def update(self, instance, validated_data):
+        previous_post_id, previous_rating = instance.post_id, instance.rating
+        instance = super(ReviewSerializer, self).update(instance, validated_data)
+        if instance.post_id != previous_post_id:
+            counters.add_rating(previous_post_id, *counters.rating_delta(previous_rating, None))
+            previous_rating = None
+        counters.add_rating(instance.post_id, *counters.rating_delta(previous_rating, instance.rating))
+        return instance
+
 
 class CartSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
+from django.dispatch import receiver
+from user.models import User
+from .models import Post, Like, PostViewer, Bookmark, Comment, Review
+from . import counters
+from .hashtags import HASHTAG_SOURCE_FIELDS, sync_post_hashtags
+from .ranking import get_ranker
+from .search import update_post_search_vectors
+from .tasks import index_posts, delete_posts_from_index, record_hashtag_trends
+
+COUNTED_MODELS = {
+    Like: 'like_count',
+    PostViewer: 'view_count',
+    Bookmark: 'bookmark_count',
+    Comment: 'comment_count',
+}
+
+
+# Likes, views, bookmarks, comments and review ratings are counted where they are
+# created and destroyed (serializers and views), not from per-row signals: a
+# post_delete receiver would make every cascade load and count the rows one by one.
+@receiver(pre_delete, sender=User)
+def uncount_user_engagement(sender, instance, **kwargs):
+    """Take a deleted user's engagement off the counters of other users' posts, grouped per post."""
+    for model, field in COUNTED_MODELS.items():
+        totals = model.objects.filter(user=instance).exclude(post__user=instance).order_by() \
+            .values('post_id').annotate(total=Count('id')).values_list('post_id', 'total')
+        counters.increment_many(field, {post_id: -total for post_id, total in totals if post_id})
+    ratings = Review.objects.filter(user=instance, rating__isnull=False).exclude(post__user=instance).order_by() \
+        .values('post_id').annotate(total=Sum('rating'), reviews=Count('id')) \
+        .values_list('post_id', 'total', 'reviews')
+    for post_id, total, reviews in ratings:
+        counters.add_rating(post_id, -total, -reviews)
+
+
+@receiver(pre_save, sender=Post)
+def score_new_post(sender, instance, **kwargs):
+    if instance._state.adding and not instance.score:
+        instance.score = get_ranker().score(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_post_saved(sender, instance, **kwargs):
+    post_ids = [instance.id]
+    update_post_search_vectors(post_ids)
+    transaction.on_commit(lambda: index_posts.delay(post_ids))
+
+
+@receiver(post_delete, sender=Post)
+def index_post_deleted(sender, instance, **kwargs):
+    post_ids = [instance.id]
+    transaction.on_commit(lambda: delete_posts_from_index.delay(post_ids))
+
+
+@receiver(post_save, sender=Post)
+def sync_hashtags_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields is not None and not HASHTAG_SOURCE_FIELDS.intersection(update_fields):
+        return
+    added = sync_post_hashtags(instance)
+    if added:
+        category_id, tagged_at = instance.category_id, instance.created_at.isoformat()
+        transaction.on_commit(lambda: record_hashtag_trends.delay(added, category_id, tagged_at))
@@ -1,10 +1,14 @@
-from celery import shared_task
+from celery import group, shared_task
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
+from django.utils.dateparse import parse_datetime
 from django.utils.encoding import smart_bytes
 from django.utils.http import urlsafe_base64_encode
 from api.models import Post
+from api import counters, hashtags, images, interest_feed, timeline
+from api.search import get_search_backend
+from api.utils import chunked
 from GizShare.email.backend import get_info_connection
 from user.models import User
 
@@ -12,38 +16,132 @@ from user.models import User
 @shared_task
 def send_post_notification_email(post_id):
     try:
-        post = Post.objects.get(id=post_id)
+        post = Post.objects.select_related('category').get(id=post_id)
         subject = f"New post in {post.category.name}"
 
         uidb64 = urlsafe_base64_encode(smart_bytes(post.id))
         post_notification_link = f'http://{settings.CURRENT_SITE}/v1/post_notification/{uidb64}/'
+        post_image = post.images.first()
 
-        interested_users = User.objects.filter(interestedcategory__category=post.category).exclude(
-            id=post.user.id).distinct()
+        message_html = render_to_string('post.html', {
+            'post_category_name': post.category.name,
+            'post_url': post_notification_link,
+            'post_description': post.description,
+            'post_image': post_image.image.url if post_image else '',
+        })
 
-        connection, from_email = get_info_connection()
+        recipients = User.objects.filter(interestedcategory__category=post.category).exclude(
+            id=post.user_id).values_list('email', flat=True).distinct()
 
-        for user in interested_users:
-            message_html = render_to_string('post.html', {
-                'post_category_name': post.category.name,
-                'post_url': post_notification_link,
-                'post_description': post.description,
-                'post_image': post.images.first().image.url if post.images.first() else '',
-            })
-
-            email_message = EmailMultiAlternatives(
-                subject=subject,
-                body=message_html,
-                from_email=from_email,
-                to=[user.email],
-                connection=connection
-            )
-            email_message.content_subtype = 'html'
-            email_message.send(fail_silently=False)
-
-            print(f"Email sent to {user.email}")
+        group(
+            send_post_notification_chunk.s(subject, message_html, emails)
+            for emails in chunked(recipients.iterator(), settings.POST_NOTIFICATION_EMAIL_CHUNK_SIZE)
+        ).apply_async()
 
     except Post.DoesNotExist:
         print(f"Post with ID {post_id} does not exist.")
     except Exception as e:
         print(f"Error sending email notification: {e}")
+
+
+@shared_task
+def send_post_notification_chunk(subject, message_html, emails):
+    connection, from_email = get_info_connection()
+    messages = []
+    for email in emails:
+        email_message = EmailMultiAlternatives(
+            subject=subject,
+            body=message_html,
+            from_email=from_email,
+            to=[email],
+        )
+        email_message.content_subtype = 'html'
+        messages.append(email_message)
+
+    try:
+        with connection:
+            sent = connection.send_messages(messages)
+        print(f"Post notification email sent to {sent} of {len(emails)} users")
+    except Exception as e:
+        print(f"Error sending email notification: {e}")
+
+
+@shared_task
+def fan_out_post_to_timelines(post_id):
+    try:
+        post = Post.objects.only('id', 'user_id', 'created_at').get(id=post_id)
+    except Post.DoesNotExist:
+        print(f"Post with ID {post_id} does not exist.")
+        return
+    timeline.fan_out_post(post)
+
+
+@shared_task
+def trim_timelines():
+    trimmed = timeline.trim_timelines()
+    print(f"Trimmed {trimmed} timeline entries.")
+    return trimmed
+
+
+@shared_task
+def push_post_to_interest_feeds(post_id):
+    try:
+        post = Post.objects.only('id', 'user_id', 'topic_id', 'category_id', 'created_at').get(id=post_id)
+    except Post.DoesNotExist:
+        print(f"Post with ID {post_id} does not exist.")
+        return
+    interest_feed.push_post(post)
+
+
+@shared_task
+def backfill_follower_timeline(user_id, following_user_id):
+    timeline.backfill_timeline(user_id, following_user_id)
+
+
+@shared_task
+def reconcile_post_counters(batch_size=1000):
+    post_ids = Post.objects.order_by('id').values_list('id', flat=True)
+    last_id = 0
+    drifted = 0
+    while True:
+        batch = list(post_ids.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        drifted += counters.reconcile(batch)
+        last_id = batch[-1]
+    print(f"Reconciled post counters, fixed {drifted} posts.")
+    return drifted
+
+
+@shared_task
+def index_posts(post_ids):
+    posts = list(Post.objects.filter(id__in=post_ids).select_related('category', 'topic'))
+    if posts:
+        get_search_backend().index(posts)
+    missing = set(post_ids) - {post.id for post in posts}
+    if missing:
+        get_search_backend().delete(missing)
+
+
+@shared_task
+def delete_posts_from_index(post_ids):
+    get_search_backend().delete(post_ids)
+
+
+@shared_task
+def record_hashtag_trends(hashtag_ids, category_id, tagged_at):
+    hashtags.record_trends(hashtag_ids, category_id, parse_datetime(tagged_at))
+
+
+@shared_task
+def prune_hashtag_trends():
+    deleted = hashtags.prune_trends()
+    print(f"Pruned {deleted} hashtag trend buckets.")
+    return deleted
+
+
+@shared_task
+def generate_post_image_variants(post_image_ids):
+    processed = images.process_post_images(post_image_ids)
+    print(f"Generated variants of {processed} post images.")
+    return processed
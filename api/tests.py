@@ -1,3 +1,612 @@
-from django.test import TestCase
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from GizShare.pagination import KeysetPagination, SearchPagination
+from user.models import User
+from .models import (Category, Comment, Follower, Hashtag, HashtagTrend, InterestedCategory, Like, Post, PostHashtag,
+                     PostImage, PostViewer, Review, TimelineEntry)
+from .search import FailoverBackend, SQLiteFTSBackend
+from .viewbuffer import PostViewBuffer
+from .views import EditReviewView, PostLikeView, PostUnlikeView, PostView, ReviewView
+from . import counters, hashtags, images, interest_feed, ranking, timeline
 
-# Create your tests here.
+try:
+    from fakeredis import TcpFakeServer
+except ImportError:
+    TcpFakeServer = None
+
+
+def make_user(name):
+    return User.objects.create_user(password='password', username=name, email=f'{name}@example.com')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_request(path='/post/', **params):
+    return Request(APIRequestFactory().get(path, params))
+
+
+def follow_link(link):
+    return get_request(**{key: values[0] for key, values in parse_qs(urlparse(link).query).items()})
+
+
+def make_post(user, category=None, **fields):
+    category = category or Category.objects.get_or_create(name='articles')[0]
+    return Post.objects.create(user=user, category=category, hashtag=fields.pop('hashtag', ''), **fields)
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author')
+        self.followers = [make_user(f'follower{i}') for i in range(3)]
+        for follower in self.followers:
+            Follower.objects.create(user=follower, following_user=self.author)
+
+    def test_fan_out_reaches_author_and_followers(self):
+        post = make_post(self.author)
+        timeline.fan_out_post(post)
+        owners = set(TimelineEntry.objects.filter(post=post).values_list('user_id', flat=True))
+        self.assertEqual(owners, {self.author.id, *(follower.id for follower in self.followers)})
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_trim_keeps_newest_entries(self):
+        posts = [make_post(self.author) for _ in range(4)]
+        for post in posts:
+            timeline.fan_out_post(post)
+        self.assertEqual(TimelineEntry.objects.filter(user=self.author).count(), 4)
+
+        trimmed = timeline.trim_timelines()
+
+        self.assertEqual(trimmed, 2 * (1 + len(self.followers)))
+        kept = TimelineEntry.objects.filter(user=self.author).values_list('post_id', flat=True)
+        self.assertEqual(set(kept), {posts[2].id, posts[3].id})
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_trim_leaves_short_timelines_alone(self):
+        timeline.fan_out_post(make_post(self.author))
+        self.assertEqual(timeline.trim_timelines(), 0)
+        self.assertEqual(TimelineEntry.objects.count(), 1 + len(self.followers))
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.users = [make_user('first'), make_user('second')]
+        self.posts = [make_post(self.users[index % 2], price=index if index % 2 else None) for index in range(5)]
+
+    def walk(self, queryset, **params):
+        pages, request = [], get_request(limit=2, **params)
+        while request is not None:
+            paginator = KeysetPagination()
+            pages.append([post.id for post in paginator.paginate_queryset(queryset, request)])
+            link = paginator.get_next_link()
+            request = follow_link(link) if link else None
+        return pages
+
+    def test_cursor_round_trip_covers_every_row_once(self):
+        pages = self.walk(Post.objects.all())
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), [post.id for post in reversed(self.posts)])
+
+    def test_previous_link_returns_the_page_before(self):
+        paginator = KeysetPagination()
+        first = [post.id for post in paginator.paginate_queryset(Post.objects.all(), get_request(limit=2))]
+        self.assertIsNone(paginator.get_previous_link())
+        paginator.paginate_queryset(Post.objects.all(), follow_link(paginator.get_next_link()))
+
+        previous = KeysetPagination()
+        page = previous.paginate_queryset(Post.objects.all(), follow_link(paginator.get_previous_link()))
+        self.assertEqual([post.id for post in page], first)
+        self.assertIsNotNone(previous.get_next_link())
+        self.assertIsNone(previous.get_previous_link())
+
+    def test_response_keeps_count_and_previous(self):
+        paginator = KeysetPagination()
+        paginator.paginate_queryset(Post.objects.all(), get_request(limit=2))
+        response = paginator.get_paginated_response([])
+        self.assertEqual(list(response.data), ['count', 'next', 'previous', 'results'])
+        self.assertEqual(response.data['count'], 5)
+
+    def test_foreign_key_ordering_seeks_on_the_column(self):
+        queryset = Post.objects.order_by('-user')
+        pages = self.walk(queryset)
+        self.assertEqual(sum(pages, []), list(queryset.order_by('-user_id', '-id').values_list('id', flat=True)))
+
+    def test_nullable_ordering_falls_back_to_offset(self):
+        queryset = Post.objects.order_by('-price')
+        paginator = KeysetPagination()
+        paginator.paginate_queryset(queryset, get_request(limit=2))
+        self.assertIsNone(paginator.ordering)
+        self.assertEqual(sorted(sum(self.walk(queryset), [])), sorted(post.id for post in self.posts))
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ('not-base64', KeysetPagination._encode(['x']), KeysetPagination._encode({'before': [None, 1]})):
+            with self.assertRaises(NotFound):
+                KeysetPagination().paginate_queryset(Post.objects.all(), get_request(cursor=cursor))
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author')
+        self.reader = make_user('reader')
+        self.post = make_post(self.author)
+
+    def request(self, view, method='post', data=None, **kwargs):
+        request = getattr(APIRequestFactory(), method)('/', data or {}, format='json')
+        force_authenticate(request, self.reader)
+        return view.as_view()(request, **kwargs)
+
+    def test_like_and_unlike_update_the_counter(self):
+        response = self.request(PostLikeView, data={'post': self.post.id})
+        self.assertEqual(response.status_code, 201)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+        self.request(PostUnlikeView, method='delete', id=response.data['id'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_cascade_delete_does_not_count_row_by_row(self):
+        viewers = [make_user(f'viewer{i}') for i in range(20)]
+        PostViewer.objects.bulk_create([PostViewer(user=user, post=self.post) for user in viewers])
+        Like.objects.bulk_create([Like(user=user, post=self.post) for user in viewers])
+        with CaptureQueriesContext(connection) as queries:
+            self.post.delete()
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+        self.assertLess(len(queries), 20)
+
+    def test_deleting_a_user_takes_their_engagement_off_other_posts(self):
+        Like.objects.create(user=self.reader, post=self.post)
+        Comment.objects.create(user=self.reader, post=self.post, content='hi')
+        counters.reconcile([self.post.id])
+        self.reader.delete()
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count), (0, 0))
+
+    def test_reconcile_fixes_drift_in_one_update(self):
+        Like.objects.create(user=self.reader, post=self.post)
+        Review.objects.create(user=self.reader, post=self.post, rating=4, content='ok')
+        Review.objects.create(user=self.author, post=self.post, rating=1, content='meh')
+        counters.reconcile([self.post.id])
+        # Lost and doubled events move the counters and the score alike.
+        counters.increment(self.post.id, 'like_count', 6)
+        counters.add_rating(self.post.id, -5, -2)
+
+        with CaptureQueriesContext(connection) as queries:
+            fixed = counters.reconcile([self.post.id])
+        self.assertEqual(fixed, 1)
+        self.assertEqual(len(queries), 1)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.review_count, self.post.rating_total), (1, 2, 5))
+        self.assertAlmostEqual(self.post.avg_rating, 2.5)
+        self.assertEqual(counters.reconcile([self.post.id]), 0)
+        self.assertAlmostEqual(self.post.score, ranking.get_ranker().score(self.post))
+
+    def ratings(self):
+        self.post.refresh_from_db()
+        return self.post.review_count, self.post.rating_total, self.post.avg_rating
+
+    def test_review_views_keep_the_rating_counters(self):
+        response = self.request(ReviewView, data={'post': self.post.id, 'rating': 4, 'content': 'ok'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.ratings(), (1, 4, 4.0))
+
+        self.request(EditReviewView, method='patch', data={'rating': 2}, pk=response.data['id'])
+        self.assertEqual(self.ratings(), (1, 2, 2.0))
+        self.request(EditReviewView, method='patch', data={'rating': None}, pk=response.data['id'])
+        self.assertEqual(self.ratings(), (0, 0, 0.0))
+        self.request(EditReviewView, method='patch', data={'rating': 5}, pk=response.data['id'])
+
+        self.request(EditReviewView, method='delete', pk=response.data['id'])
+        self.assertEqual(self.ratings(), (0, 0, 0.0))
+        self.assertAlmostEqual(self.post.score, ranking.get_ranker().score(self.post))
+
+    def test_deleting_a_user_takes_their_ratings_off_other_posts(self):
+        Review.objects.create(user=self.reader, post=self.post, rating=5, content='great')
+        Review.objects.create(user=self.author, post=self.post, rating=2, content='meh')
+        counters.reconcile([self.post.id])
+        self.reader.delete()
+        self.assertEqual(self.ratings(), (1, 2, 2.0))
+
+
+class RecordingViewBuffer(PostViewBuffer):
+    """Keeps timer flushes off the database so tests can assert when they would run."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.flush_requested = threading.Event()
+
+    def _flush_on_timer(self):
+        self.flush_requested.set()
+
+
+class PostViewBufferTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author')
+        self.post = make_post(self.author)
+        self.viewers = [make_user(f'viewer{i}') for i in range(3)]
+
+    def make_buffer(self, **kwargs):
+        options = {'max_events': 10, 'flush_interval': 60, 'merge_window': 30, **kwargs}
+        buffer = RecordingViewBuffer(**options)
+        self.addCleanup(lambda: buffer._timer and buffer._timer.cancel())
+        return buffer
+
+    def test_add_never_touches_the_database(self):
+        buffer = self.make_buffer(max_events=2)
+        with self.assertNumQueries(0):
+            for viewer in self.viewers:
+                buffer.add(viewer.id, self.post.id)
+        # Reaching max_events hands the flush to the background timer right away.
+        self.assertTrue(buffer.flush_requested.wait(5))
+        self.assertEqual(PostViewer.objects.count(), 0)
+
+    def test_flush_writes_views_and_counter(self):
+        buffer = self.make_buffer()
+        for viewer in self.viewers:
+            buffer.add(viewer.id, self.post.id)
+        buffer.flush()
+        self.assertEqual(PostViewer.objects.filter(post=self.post).count(), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 3)
+
+    def test_repeat_views_are_merged_until_the_window_expires(self):
+        buffer = self.make_buffer(merge_window=30)
+        with mock.patch('api.viewbuffer.time.monotonic', return_value=1000):
+            self.assertTrue(buffer.add(self.viewers[0].id, self.post.id))
+            self.assertFalse(buffer.add(self.viewers[0].id, self.post.id))
+        with mock.patch('api.viewbuffer.time.monotonic', return_value=1031):
+            self.assertTrue(buffer.add(self.viewers[1].id, self.post.id))
+            self.assertEqual(list(buffer._accepted), [(self.viewers[1].id, self.post.id)])
+            self.assertTrue(buffer.add(self.viewers[0].id, self.post.id))
+
+    def test_expiry_after_an_idle_period_is_spread_over_adds(self):
+        buffer = self.make_buffer(merge_window=30)
+        with mock.patch('api.viewbuffer.time.monotonic', return_value=1000):
+            for viewer in self.viewers:
+                buffer.add(viewer.id, self.post.id)
+        with mock.patch('api.viewbuffer.time.monotonic', return_value=2000):
+            buffer.add(self.author.id, self.post.id)
+            self.assertEqual(len(buffer._accepted), len(self.viewers) + 1 - buffer.expire_per_add)
+            # Views waiting to expire no longer merge repeats.
+            self.assertTrue(buffer.add(self.viewers[-1].id, self.post.id))
+
+    def test_failed_write_is_requeued(self):
+        buffer = self.make_buffer(max_pending=2)
+        for viewer in self.viewers:
+            buffer.add(viewer.id, self.post.id)
+        with mock.patch.object(PostViewBuffer, '_write', side_effect=RuntimeError('down')):
+            buffer.flush()
+        self.assertEqual(list(buffer._pending), [(viewer.id, self.post.id) for viewer in self.viewers[1:]])
+        buffer.flush()
+        self.assertEqual(PostViewer.objects.count(), 2)
+
+
+class SQLiteFTSBackendTests(TestCase):
+    def test_refuses_to_start_without_a_shared_file(self):
+        for path in (None, ':memory:'):
+            with self.subTest(path=path), override_settings(SEARCH_SQLITE_PATH=path):
+                with self.assertRaises(ImproperlyConfigured):
+                    SQLiteFTSBackend()
+
+    def test_indexed_posts_are_found_by_prefix(self):
+        backend = SQLiteFTSBackend(':memory:')
+        posts = [make_post(make_user('author'), title='Vintage camera'), make_post(make_user('other'), title='Bike')]
+        backend.index(posts)
+        self.assertEqual(backend.search('vint'), [posts[0].id])
+        backend.delete([posts[0].id])
+        self.assertEqual(backend.search('vint'), [])
+
+
+class SearchPaginationTests(TestCase):
+    def setUp(self):
+        self.user = make_user('author')
+        self.articles = Category.objects.create(name='articles')
+        self.gadgets = Category.objects.create(name='gadgets')
+        # Every other match is in another category, so filtered pages have to skip hits.
+        self.posts = [make_post(self.user, self.gadgets if index % 2 else self.articles, title=f'camera {index}',
+                                score=index) for index in range(10)]
+        self.backend = SQLiteFTSBackend(':memory:')
+        self.backend.index(self.posts)
+
+    def list_posts(self, **params):
+        request = APIRequestFactory().get('/post/', params)
+        force_authenticate(request, self.user)
+        with mock.patch('api.views.get_search_backend', return_value=self.backend):
+            return PostView.as_view()(request)
+
+    def test_filtered_search_pages_stay_full(self):
+        pages, params = [], {'search': 'camera', 'category': self.articles.id, 'limit': 2}
+        while params is not None:
+            response = self.list_posts(**params)
+            pages.append([post['id'] for post in response.data['results']])
+            link = response.data['next']
+            params = {key: values[0] for key, values in parse_qs(urlparse(link).query).items()} if link else None
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sorted(sum(pages, [])), [post.id for post in self.posts if post.category == self.articles])
+
+    def test_status_ordering_is_kept_for_search(self):
+        response = self.list_posts(search='camera', status='top', category=self.gadgets.id)
+        self.assertEqual([post['id'] for post in response.data['results']],
+                         [post.id for post in reversed(self.posts) if post.category == self.gadgets])
+
+    def test_status_ordered_search_says_when_matches_were_capped(self):
+        self.assertFalse(self.list_posts(search='camera', status='top').data['truncated'])
+        with override_settings(SEARCH_MAX_HITS=4):
+            response = self.list_posts(search='camera', status='top')
+        self.assertTrue(response.data['truncated'])
+        self.assertEqual(len(response.data['results']), 4)
+
+    def test_malformed_cursors_are_rejected(self):
+        for after in ('x', True, -1, [1], [1, 'x'], {'a': 1}):
+            request = get_request(cursor=SearchPagination._encode({'after': after}))
+            with self.subTest(after=after), self.assertRaises(ValidationError):
+                SearchPagination().paginate_search(self.backend, 'camera', Post.objects.all(), request)
+
+    def test_offset_backends_reject_search_after_keys(self):
+        backend = FailoverBackend(primary=self.backend, fallback=self.backend, cooldown=60)
+        request = get_request(cursor=SearchPagination._encode({'after': [1.5, 3]}))
+        with self.assertRaises(ValidationError):
+            SearchPagination().paginate_search(backend, 'camera', Post.objects.all(), request)
+        self.assertFalse(backend.is_open())
+
+
+class HashtagTests(TestCase):
+    def setUp(self):
+        self.user = make_user('author')
+
+    def post_tags(self, post):
+        return set(PostHashtag.objects.filter(post=post).values_list('hashtag__name', flat=True))
+
+    def test_parse_merges_field_and_inline_tags(self):
+        post = Post(hashtag='#Travel food travel', title='Trip #Japan', description='Ramen #FOOD and #sushi')
+        self.assertEqual(hashtags.parse_hashtags(post), ['travel', 'food', 'japan', 'sushi'])
+
+    def test_sync_follows_edits(self):
+        post = make_post(self.user, hashtag='travel food')
+        self.assertEqual(self.post_tags(post), {'travel', 'food'})
+        post.hashtag = 'food'
+        post.description = 'now #sushi'
+        post.save()
+        self.assertEqual(self.post_tags(post), {'food', 'sushi'})
+
+    def test_saves_of_other_fields_skip_the_sync(self):
+        post = make_post(self.user, hashtag='travel')
+        with mock.patch('api.signals.sync_post_hashtags') as sync:
+            post.save(update_fields=['score'])
+            sync.assert_not_called()
+            post.save(update_fields=['description'])
+            sync.assert_called_once_with(post)
+
+    def test_uncategorised_trends_share_one_row(self):
+        tag = Hashtag.objects.create(name='travel')
+        moment = timezone.now()
+        for _ in range(3):
+            hashtags.record_trends([tag.id], None, moment)
+        self.assertEqual(list(HashtagTrend.objects.values_list('category_id', 'count')), [(None, 3)])
+
+    def test_trending_ranks_by_uses_in_the_window(self):
+        travel, food = Hashtag.objects.create(name='travel'), Hashtag.objects.create(name='food')
+        category = Category.objects.create(name='articles')
+        now = timezone.now()
+        hashtags.record_trends([travel.id, food.id], category.id, now)
+        hashtags.record_trends([food.id], None, now)
+        hashtags.record_trends([travel.id], None, now - timedelta(days=30))
+        self.assertEqual([(row['hashtag__name'], row['total']) for row in hashtags.trending(hours=24)],
+                         [('food', 2), ('travel', 1)])
+        self.assertEqual([row['hashtag__name'] for row in hashtags.trending(category_id=category.id)],
+                         ['travel', 'food'])
+
+
+class InterestFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.reader = make_user('reader')
+        self.author = make_user('author')
+        self.category = Category.objects.create(name='articles')
+        InterestedCategory.objects.create(user=self.reader, category=self.category)
+        now = timezone.now()
+        self.posts = [make_post(self.author, self.category, created_at=now - timedelta(hours=index))
+                      for index in range(5)]
+
+    def walk(self, size):
+        pages, position = [], None
+        while True:
+            hits, position = interest_feed.feed_page(self.reader.id, position, size)
+            pages.append([post_id for post_id, _ in hits])
+            if position is None:
+                return pages
+
+    def test_pages_cover_the_feed_newest_first(self):
+        self.assertEqual(self.walk(2), [[post.id for post in self.posts[:2]], [post.id for post in self.posts[2:4]],
+                                        [self.posts[4].id]])
+
+    def test_new_post_between_pages_is_not_repeated(self):
+        pages = []
+        hits, position = interest_feed.feed_page(self.reader.id, None, 2)
+        pages.append([post_id for post_id, _ in hits])
+        newest = make_post(self.author, self.category)
+        interest_feed.push_post(newest)
+        while position is not None:
+            hits, position = interest_feed.feed_page(self.reader.id, position, 2)
+            pages.append([post_id for post_id, _ in hits])
+        self.assertEqual(sum(pages, []), [post.id for post in self.posts])
+        self.assertEqual(interest_feed.feed_page(self.reader.id, None, 1)[0][0][0], newest.id)
+
+    def test_push_merges_into_interested_feeds_only(self):
+        other = make_user('other')
+        interest_feed.get_feed(self.reader.id)
+        interest_feed.get_feed(other.id)
+        with override_settings(INTEREST_FEED_SIZE=5):
+            newest = make_post(self.author, self.category)
+            self.assertEqual(interest_feed.push_post(newest), 1)
+        feed = [post_id for post_id, _ in cache.get(interest_feed.feed_key(self.reader.id))]
+        self.assertEqual(feed, [newest.id] + [post.id for post in self.posts[:4]])
+        self.assertEqual(cache.get(interest_feed.feed_key(other.id)), [])
+
+
+@unittest.skipIf(TcpFakeServer is None, 'needs fakeredis')
+class RedisInterestFeedTests(InterestFeedTests):
+    """The same feed behaviour with the feeds kept in Redis sorted sets."""
+
+    @classmethod
+    def setUpClass(cls):
+        port = free_port()
+        cls.server = TcpFakeServer(('127.0.0.1', port), server_type='redis')
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.redis_cache = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://127.0.0.1:{}/0'.format(port),
+        }})
+        cls.redis_cache.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.redis_cache.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def feed(self, user_id):
+        return [post_id for post_id, _ in interest_feed.get_feed(user_id)]
+
+    def test_push_merges_into_interested_feeds_only(self):
+        other = make_user('other')
+        self.feed(self.reader.id)
+        with override_settings(INTEREST_FEED_SIZE=5):
+            newest = make_post(self.author, self.category)
+            self.assertEqual(interest_feed.push_post(newest), 1)
+            with mock.patch.object(interest_feed, 'build_feed') as build_feed:
+                self.assertEqual(self.feed(self.reader.id), [newest.id] + [post.id for post in self.posts[:4]])
+            build_feed.assert_not_called()
+        self.assertEqual(self.feed(other.id), [])
+
+    def test_push_to_an_uncached_feed_leads_to_a_rebuild(self):
+        self.assertIsNotNone(interest_feed._redis())
+        newest = make_post(self.author, self.category)
+        interest_feed.push_post(newest)
+        self.assertEqual(self.feed(self.reader.id), [newest.id] + [post.id for post in self.posts])
+
+
+class RankingTests(TestCase):
+    def setUp(self):
+        self.user = make_user('author')
+        self.ranker = ranking.get_ranker()
+
+    def test_engagement_moves_the_stored_score_in_sql(self):
+        post = make_post(self.user)
+        self.assertAlmostEqual(post.score, self.ranker.score(post))
+        counters.increment(post.id, 'like_count', 3)
+        counters.increment(post.id, 'view_count', 10)
+        counters.add_rating(post.id, 5, 1)
+        counters.increment(post.id, 'like_count', -1)
+        post.refresh_from_db()
+        self.assertEqual((post.like_count, post.view_count, post.rating_total), (2, 10, 5))
+        self.assertAlmostEqual(post.score, self.ranker.score(post))
+
+    @override_settings(POST_SCORE_HALF_LIFE_HOURS=24, POST_SCORE_NEW_POST=1)
+    def test_engagement_decays_by_age_without_rewriting_rows(self):
+        now = timezone.now()
+        old = make_post(self.user, created_at=now - timedelta(days=1))
+        new = make_post(self.user, created_at=now)
+        counters.increment(old.id, 'like_count', 1)
+        old.refresh_from_db()
+        # Twice the engagement a half-life earlier ranks level with the newer post.
+        self.assertAlmostEqual(old.score, new.score)
+        counters.increment(old.id, 'like_count', 1)
+        ranked = Post.objects.order_by('-score', '-id').values_list('id', flat=True)
+        self.assertEqual(list(ranked), [old.id, new.id])
+
+    def test_rebuild_matches_incremental_scores(self):
+        post = make_post(self.user)
+        counters.increment(post.id, 'comment_count', 2)
+        post.refresh_from_db()
+        incremental = post.score
+        Post.objects.filter(pk=post.pk).update(score=0)
+        self.assertEqual(ranking.rebuild_scores([post.id]), 1)
+        post.refresh_from_db()
+        self.assertAlmostEqual(post.score, incremental)
+
+
+@override_settings(POST_IMAGE_VARIANT_WIDTHS=[100, 300, 1000], POST_IMAGE_VARIANT_FORMATS=['webp', 'jpeg'])
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.post = make_post(make_user('author'))
+
+    def make_image(self, size, orientation=None):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        if orientation:
+            exif[images.ORIENTATION] = orientation
+        Image.new('RGB', size, (200, 40, 40)).save(buffer, 'JPEG', exif=exif)
+        return PostImage.objects.create(post=self.post, image=ContentFile(buffer.getvalue(), name='photo.jpg'))
+
+    def stored_size(self, path):
+        with PostImage._meta.get_field('image').storage.open(path) as file:
+            return Image.open(file).size
+
+    def test_widths_below_the_original(self):
+        self.assertEqual(images.variant_widths(500), [100, 300])
+        self.assertEqual(images.variant_widths(2000), [100, 300, 1000])
+        self.assertEqual(images.variant_widths(80), [80])
+
+    def test_variants_keep_the_aspect_ratio(self):
+        post_image = self.make_image((600, 400))
+        variants = images.generate_variants(post_image)
+        self.assertEqual(sorted(variants), ['jpeg', 'webp'])
+        for name, items in variants.items():
+            self.assertEqual([(item['width'], item['height']) for item in items], [(100, 67), (300, 200)])
+            for item in items:
+                self.assertEqual(self.stored_size(item['path']), (item['width'], item['height']))
+        post_image.refresh_from_db()
+        self.assertEqual((post_image.width, post_image.height, post_image.variants), (600, 400, variants))
+
+    def test_exif_rotation_swaps_the_sizes(self):
+        # Orientation 6 stores a portrait photo sideways.
+        post_image = self.make_image((800, 400), orientation=6)
+        variants = images.generate_variants(post_image)
+        self.assertEqual((post_image.width, post_image.height), (400, 800))
+        self.assertEqual([(item['width'], item['height']) for item in variants['jpeg']], [(100, 200), (300, 600)])
+        self.assertEqual(self.stored_size(variants['jpeg'][-1]['path']), (300, 600))
+
+    def test_regenerating_replaces_stale_variants(self):
+        post_image = self.make_image((600, 400))
+        old = images.generate_variants(post_image)
+        with override_settings(POST_IMAGE_VARIANT_FORMATS=['jpeg']):
+            images.generate_variants(post_image)
+        storage = PostImage._meta.get_field('image').storage
+        self.assertFalse(any(storage.exists(item['path']) for item in old['webp']))
+        self.assertTrue(all(storage.exists(item['path']) for item in old['jpeg']))
+
+    def test_srcset_lists_every_width(self):
+        variants = {'webp': [{'width': 100, 'path': 'a.webp'}, {'width': 300, 'path': 'b.webp'}]}
+        self.assertEqual(images.srcset(variants, lambda path: '/media/' + path),
+                         {'webp': '/media/a.webp 100w, /media/b.webp 300w'})
+        self.assertEqual(images.srcset(None, str), {})
@@ -0,0 +1,75 @@
+from itertools import chain
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from .models import Post, Follower, TimelineEntry
+from .utils import chunked
+
+
+def trim_timeline(user_id):
+    """
+    Drop the entries of one timeline beyond ``TIMELINE_MAX_LENGTH``. The cut-off entry
+    is found by seeking the owner's (created_at, id) index, so no window over the rows.
+    """
+    cutoff = list(TimelineEntry.objects.filter(user_id=user_id).order_by('-created_at', '-id')
+                  .values_list('created_at', 'id')[settings.TIMELINE_MAX_LENGTH:settings.TIMELINE_MAX_LENGTH + 1])
+    if not cutoff:
+        return 0
+    created_at, entry_id = cutoff[0]
+    return TimelineEntry.objects.filter(user_id=user_id).filter(
+        Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=entry_id)
+    ).delete()[0]
+
+
+def trim_timelines(user_ids=None):
+    """
+    Trim the timelines that grew past ``TIMELINE_MAX_LENGTH``, all of them when
+    ``user_ids`` is ``None``. Fan-out does not trim, this runs from a periodic task.
+    """
+    owners = TimelineEntry.objects.order_by().values('user_id').annotate(total=Count('id')) \
+        .filter(total__gt=settings.TIMELINE_MAX_LENGTH)
+    if user_ids is not None:
+        owners = owners.filter(user_id__in=user_ids)
+    return sum(trim_timeline(owner['user_id']) for owner in owners.iterator())
+
+
+def fan_out_post(post):
+    """Push a new post into the timelines of its author and every follower of the author."""
+    followers = Follower.objects.filter(following_user_id=post.user_id).values_list('user_id', flat=True)
+    owner_ids = chain([post.user_id], followers.iterator())
+
+    for user_ids in chunked(owner_ids, settings.TIMELINE_FAN_OUT_BATCH_SIZE):
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user_id=user_id, post_id=post.id, author_id=post.user_id, created_at=post.created_at)
+            for user_id in user_ids
+        ], ignore_conflicts=True)
+
+
+def backfill_timeline(user_id, author_id):
+    """Copy the latest posts of a newly followed user into the follower's timeline."""
+    posts = Post.objects.filter(user_id=author_id).order_by('-created_at', '-id').values_list('id', 'created_at')
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(user_id=user_id, post_id=post_id, author_id=author_id, created_at=created_at)
+        for post_id, created_at in posts[:settings.TIMELINE_BACKFILL_SIZE]
+    ], ignore_conflicts=True)
+    trim_timeline(user_id)
+
+
+def remove_from_timeline(user_id, author_id):
+    """Remove an unfollowed user's posts from the follower's timeline."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild_timeline(user_id):
+    """Rebuild a timeline from scratch out of the latest posts of the user and everyone they follow."""
+    following_user_ids = Follower.objects.filter(user_id=user_id).values('following_user_id')
+    posts = Post.objects.filter(
+        Q(user_id__in=following_user_ids) | Q(user_id=user_id)
+    ).order_by('-created_at', '-id').values_list('id', 'user_id', 'created_at')
+
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user_id=user_id, post_id=post_id, author_id=author_id, created_at=created_at)
+            for post_id, author_id, created_at in posts[:settings.TIMELINE_MAX_LENGTH]
+        ])
@@ -38,4 +38,5 @@ urlpatterns = [
     path('post-report/', views.PostReportView.as_view(), name='post_report'),
     path('comment-report/', views.CommentReportView.as_view(), name='comment_report'),
     path('download/', views.DownloadView.as_view(), name='download'),
+    path('hashtag/trending/', views.TrendingHashtagView.as_view(), name='trending_hashtag'),
 ]
@@ -7,3 +7,15 @@ def validate_image(value):
 
     if filesize > 10 * 1024 * 1024:
         raise ValidationError(_('The maximum file size of file is 10MB'))
+
+
+def chunked(iterable, size):
+    """Yield lists of at most ``size`` items from ``iterable`` without materializing it."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,126 @@
+import atexit
+import threading
+import time
+from collections import Counter, deque
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from .models import Post, PostViewer
+from . import counters
+
+
+class PostViewBuffer:
+    """
+    Write-behind buffer for post views.
+
+    ``add`` is a constant-time append under a lock and never touches the
+    database. Pending views are written with one ``bulk_create`` from a
+    background timer, ``flush_interval`` seconds after the first pending view,
+    or right away (still off the request thread) once ``max_events`` are queued.
+    A batch that fails to write is put back and retried on the next flush; at
+    most ``max_pending`` views are held while the database is unavailable.
+
+    A repeat view of the same post by the same user within ``merge_window``
+    seconds is merged into the first one and never reaches the database.
+    Accepted views are expired oldest first from a queue, at most
+    ``expire_per_add`` per ``add``: more than the one it appends, so the queue
+    drains, yet the first ``add`` after an idle period stays constant-time.
+    Expired entries still waiting in the queue are ignored by the merge check.
+    """
+    expire_per_add = 2
+
+    def __init__(self, max_events, flush_interval, merge_window, max_pending=None):
+        self.max_events = max_events
+        self.flush_interval = flush_interval
+        self.merge_window = merge_window
+        self.max_pending = max_pending or max_events * 10
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._accepted = {}
+        self._accepted_order = deque()
+        self._timer = None
+        self._timer_due_now = False
+
+    def add(self, user_id, post_id):
+        key = (user_id, post_id)
+        now = time.monotonic()
+        with self._lock:
+            self._forget_expired(now)
+            accepted_at = self._accepted.get(key)
+            if accepted_at is not None and now - accepted_at < self.merge_window:
+                return False
+            self._accepted[key] = now
+            self._accepted_order.append((now, key))
+            self._pending[key] = timezone.now()
+            self._schedule(due_now=len(self._pending) >= self.max_events)
+        return True
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+        try:
+            self._write(pending)
+        except Exception as e:
+            self._requeue(pending, e)
+
+    def _schedule(self, due_now):
+        """Start the flush timer, or bring it forward to now; called with the lock held."""
+        if self._timer is not None and (self._timer_due_now or not due_now):
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(0 if due_now else self.flush_interval, self._flush_on_timer)
+        self._timer.daemon = True
+        self._timer_due_now = due_now
+        self._timer.start()
+
+    def _requeue(self, pending, error):
+        with self._lock:
+            # Failed views go back in front, so the oldest are the ones dropped past the limit.
+            self._pending = {**pending, **self._pending}
+            dropped = len(self._pending) - self.max_pending
+            if dropped > 0:
+                for key in list(self._pending)[:dropped]:
+                    del self._pending[key]
+            if self._pending:
+                self._schedule(due_now=False)
+        print(f"Error flushing {len(pending)} post views, retrying in {self.flush_interval}s: {error}")
+        if dropped > 0:
+            print(f"Dropped {dropped} post views, more than {self.max_pending} are waiting to be written")
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+    def _forget_expired(self, now):
+        expired_before = now - self.merge_window
+        for _ in range(self.expire_per_add):
+            if not self._accepted_order or self._accepted_order[0][0] >= expired_before:
+                break
+            accepted_at, key = self._accepted_order.popleft()
+            if self._accepted.get(key) == accepted_at:
+                del self._accepted[key]
+
+    @staticmethod
+    def _write(pending):
+        post_ids = set(Post.objects.filter(id__in={post_id for _, post_id in pending}).values_list('id', flat=True))
+        viewers = [PostViewer(user_id=user_id, post_id=post_id, created_at=viewed_at, updated_at=viewed_at)
+                   for (user_id, post_id), viewed_at in pending.items() if post_id in post_ids]
+        with transaction.atomic():
+            PostViewer.objects.bulk_create(viewers)
+            counters.increment_many('view_count', Counter(viewer.post_id for viewer in viewers))
+
+
+post_view_buffer = PostViewBuffer(
+    max_events=settings.POST_VIEW_BUFFER_SIZE,
+    flush_interval=settings.POST_VIEW_FLUSH_INTERVAL_MS / 1000,
+    merge_window=settings.POST_VIEW_MERGE_WINDOW_SECONDS,
+)
+atexit.register(post_view_buffer.flush)
@@ -1,28 +1,38 @@
+from django.conf import settings
 from django.utils.http import urlsafe_base64_decode
 from rest_framework.filters import SearchFilter
 
 from GizShare.permissions import IsOwnerOrReadOnly
 from .models import (Category, InterestedCategory, Topic, CustomTopic, InterestedTopic, Post,
                      Comment, Like, CommentLike, Follower, PostViewer, Bookmark, Review,
-                     Cart, Address, Order, PostImage, PostReport, CommentReport, Download)
+                     Cart, Address, Order, PostImage, PostReport, CommentReport, Download, TimelineEntry)
 from .serializers import (InterestedCategorySerializer, TopicSerializer,
                           CustomTopicSerializer, InterestedTopicSerializer, PostSerializer, CommentSerializer,
                           LikeSerializer, CommentLikeSerializer, FollowSerializer,
                           PostViewSerializer, BookMarkSerializer, ReviewSerializer, CartSerializer,
                           AddressSerializer, OrderSerializer, FollowGetSerializer, CategorySerializer,
                           PostReportSerializer,
-                          CommentReportSerializer, DownloadSerializer)
-from rest_framework import generics
+                          CommentReportSerializer, DownloadSerializer, PostViewEventSerializer,
+                          TrendingHashtagSerializer)
+from rest_framework import generics, status
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
-from django.db.models import Count, Prefetch, Avg, Q
+from django.db.models import Count, Prefetch, Q, F
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from user.models import User
 from user.serializers import UserSerializer
-from .filters import CategoryFilter, TopicFilter, InterestedCategoryFilter, InterestedTopicFilter, PostFilter, \
-    PostElasticSearchFilter
+from notification.genrator import unlike_notification
+from .hashtags import trending
+from .interest_feed import feed_page
+from .search import get_search_backend
+from .timeline import remove_from_timeline
+from .viewbuffer import post_view_buffer
+from . import counters
+from GizShare.pagination import KeysetPagination, SearchPagination, TimelinePagination
+from .filters import CategoryFilter, TopicFilter, InterestedCategoryFilter, InterestedTopicFilter, PostFilter
 
 
 class DashboardView(APIView):
@@ -117,12 +127,32 @@ class PostView(generics.ListCreateAPIView):
     """This view endpoint for listing and creating posts."""
     serializer_class = PostSerializer
     permission_classes = (IsAuthenticated,)
-    filter_backends = [PostElasticSearchFilter, DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend]
     filterset_class = PostFilter
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         return Post.objects.prefetch_related(Prefetch('images', queryset=PostImage.objects.all()))
 
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get(api_settings.SEARCH_PARAM)
+        if not query:
+            return super(PostView, self).list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        if queryset.query.order_by:
+            # The status filter picked an order, so keep it and only use the engine to find matches.
+            # Those are capped at SEARCH_MAX_HITS; ``truncated`` tells clients when more matched.
+            post_ids = get_search_backend().search(query, limit=settings.SEARCH_MAX_HITS + 1)
+            page = self.paginate_queryset(queryset.filter(id__in=post_ids[:settings.SEARCH_MAX_HITS]))
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+            response.data['truncated'] = len(post_ids) > settings.SEARCH_MAX_HITS
+            return response
+        # Search results: page ids from the search engine and hydrate only those rows.
+        paginator = SearchPagination()
+        page = paginator.paginate_search(get_search_backend(), query, queryset, request)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
 
 class PostEditView(generics.RetrieveUpdateDestroyAPIView):
     """This view endpoint for retrieving, updating, and deleting a post."""
@@ -140,6 +170,7 @@ class CommentView(generics.ListCreateAPIView):
     """This view endpoint for listing and creating comments."""
     serializer_class = CommentSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         return Comment.objects.prefetch_related('replies').all()
@@ -163,6 +194,11 @@ class PostUnlikeView(generics.RetrieveDestroyAPIView):
     def get_queryset(self):
         return Like.objects.select_related('user', 'post').all()
 
+    def perform_destroy(self, instance):
+        instance.delete()
+        counters.increment(instance.post_id, 'like_count', -1)
+        unlike_notification(instance)
+
 
 class CommentLikeView(generics.ListCreateAPIView):
     """This view endpoint for listing and creating comment likes."""
@@ -203,6 +239,10 @@ class FollowDetailView(generics.RetrieveDestroyAPIView):
     def get_queryset(self):
         return Follower.objects.select_related('following_user', 'user').all()
 
+    def perform_destroy(self, instance):
+        remove_from_timeline(instance.user_id, instance.following_user_id)
+        instance.delete()
+
 
 class PostViewerView(generics.ListCreateAPIView):
     """This view endpoint for listing and creating post views."""
@@ -210,9 +250,15 @@ class PostViewerView(generics.ListCreateAPIView):
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return PostViewer.objects.select_related('post').annotate(
-            view_count=Count('post__post_viewers')
-        )
+        return PostViewer.objects.select_related('post').annotate(view_count=F('post__view_count'))
+
+    def create(self, request, *args, **kwargs):
+        if not settings.POST_VIEW_BUFFERING:
+            return super(PostViewerView, self).create(request, *args, **kwargs)
+        serializer = PostViewEventSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        post_view_buffer.add(request.user.id, serializer.validated_data['post'])
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
 
 class BookmarkView(generics.ListCreateAPIView):
@@ -222,7 +268,7 @@ class BookmarkView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         return Bookmark.objects.filter(user=self.request.user).select_related('post').annotate(
-            count=Count('post__post_bookmark')
+            count=F('post__bookmark_count')
         )
 
 
@@ -235,15 +281,20 @@ class EditBookmarkView(generics.RetrieveDestroyAPIView):
     def get_queryset(self):
         return Bookmark.objects.filter(user=self.request.user).select_related('user')
 
+    def perform_destroy(self, instance):
+        instance.delete()
+        counters.increment(instance.post_id, 'bookmark_count', -1)
+
 
 class ReviewView(generics.ListCreateAPIView):
     """This view endpoint for listing and creating reviews."""
     serializer_class = ReviewSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         queryset = Review.objects.annotate(
-            average_rating=Avg('post__review__rating')
+            average_rating=F('post__avg_rating')
         ).order_by('-created_at')
         return queryset
 
@@ -255,6 +306,10 @@ class EditReviewView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         return Review.objects.select_related('user')
 
+    def perform_destroy(self, instance):
+        instance.delete()
+        counters.add_rating(instance.post_id, *counters.rating_delta(instance.rating, None))
+
 
 class CartView(generics.ListCreateAPIView):
     """This view endpoint for listing and creating cart items."""
@@ -359,39 +414,41 @@ class OrganizationDetailView(generics.ListAPIView):
         )
 
 
-class PostFollowerView(APIView):
+class PostFollowerView(generics.ListAPIView):
+    """This view endpoint for listing the user's precomputed home timeline."""
     serializer_class = PostSerializer
-
     permission_classes = (IsAuthenticated,)
+    pagination_class = TimelinePagination
 
-    def get(self, request, *args, **kwargs):
-        following_user_ids = self.request.user.follower_user.all().values_list("following_user_id", flat=True)
-
-        following_user_ids = list(following_user_ids) + [self.request.user.id]
-
-        posts = Post.objects.select_related('user').prefetch_related(
-            Prefetch('images', queryset=PostImage.objects.all())
-        ).filter(user__in=following_user_ids)
-
-        post_serializer = PostSerializer(posts, many=True)
-
-        data = {
-            'posts': post_serializer.data,
-        }
+    def get_queryset(self):
+        return TimelineEntry.objects.filter(user=self.request.user).select_related('post').prefetch_related(
+            Prefetch('post__images', queryset=PostImage.objects.all())
+        )
 
-        return Response(data)
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        post_serializer = self.get_serializer([entry.post for entry in page], many=True)
+        return self.get_paginated_response(post_serializer.data)
 
 
 class PostInterestView(generics.ListAPIView):
+    """
+    This view endpoint for posts in the user's interested topics and categories,
+    newest first with topic matches ranked ahead, from the cached interest feed.
+    """
     serializer_class = PostSerializer
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        user_topics = InterestedTopic.objects.filter(user=self.request.user).values_list('topic_id', flat=True)
+        return Post.objects.prefetch_related(Prefetch('images', queryset=PostImage.objects.all()))
 
-        return Post.objects.exclude(user=self.request.user).filter(
-            topic_id__in=user_topics
-        ).distinct()
+    def list(self, request, *args, **kwargs):
+        paginator = SearchPagination()
+        user_id = request.user.id
+        page = paginator.paginate_ranked(lambda position, size: feed_page(user_id, position, size),
+                                         self.get_queryset(), request)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class PostDetailView(generics.RetrieveAPIView):
@@ -423,4 +480,19 @@ class CommentReportView(generics.ListCreateAPIView):
 class DownloadView(generics.ListCreateAPIView):
     serializer_class = DownloadSerializer
     permission_classes = [IsAuthenticated]
-    queryset = Download.objects.all()
\ No newline at end of file
+    queryset = Download.objects.all()
+
+
+class TrendingHashtagView(APIView):
+    """This view endpoint for the top trending hashtags, overall or within ``?category=``."""
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            category_id = request.query_params.get('category')
+            category_id = int(category_id) if category_id else None
+            limit = min(int(request.query_params.get('limit', settings.HASHTAG_TRENDING_LIMIT)), 50)
+        except ValueError:
+            return Response({'error': 'category and limit must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = TrendingHashtagSerializer(trending(category_id, limit=max(limit, 1)), many=True)
+        return Response(serializer.data)
@@ -0,0 +1,101 @@
+import asyncio
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from .models import Conversation, UserMessage
+
+
+class MessageBatcher:
+    """
+    Per-process write batcher for chat messages.
+
+    Every consumer on the event loop hands its outgoing message to ``submit``
+    and awaits the saved ``UserMessage``. Pending messages are written with one
+    ``bulk_create`` and one conversation ``UPDATE`` in a single transaction
+    ``interval`` seconds after the first one arrives, or as soon as
+    ``max_size`` are queued. Only one batch is written at a time and rows keep
+    their submission order, so ids grow in send order within every conversation.
+    """
+
+    def __init__(self, max_size, interval):
+        self.max_size = max_size
+        self.interval = interval
+        self._pending = []
+        self._handle = None
+        self._lock = None
+
+    async def submit(self, room, user_id, m_type, message, ratio):
+        loop = asyncio.get_running_loop()
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        future = loop.create_future()
+        user_message = UserMessage(conversation_id=room.id, user_id=user_id, message=message, m_type=m_type,
+                                   ratio=ratio)
+        self._pending.append((user_message, room.second_id == user_id, future))
+        if len(self._pending) >= self.max_size:
+            self._schedule(loop, 0)
+        elif self._handle is None:
+            self._schedule(loop, self.interval)
+        return await future
+
+    def _schedule(self, loop, delay):
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = loop.call_later(delay, lambda: asyncio.ensure_future(self.flush()))
+
+    async def flush(self):
+        async with self._lock:
+            self._handle = None
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                await database_sync_to_async(write_batch)(batch)
+            except Exception as e:
+                print(f"Error writing {len(batch)} chat messages: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for user_message, _, future in batch:
+                if not future.done():
+                    future.set_result(user_message)
+
+
+def write_batch(batch):
+    """
+    Insert a batch of ``(UserMessage, from_second, future)`` entries in order and
+    fold their effect on each conversation into a single ``UPDATE``.
+    """
+    # conversation id -> [reset unread_first, unread_first added, reset unread_second, unread_second added, last]
+    states = {}
+    for user_message, from_second, _ in batch:
+        state = states.setdefault(user_message.conversation_id, [False, 0, False, 0, None])
+        if from_second:
+            state[1] += 1
+            state[2], state[3] = True, 0
+        else:
+            state[0], state[1] = True, 0
+            state[3] += 1
+        state[4] = user_message
+
+    with transaction.atomic():
+        UserMessage.objects.bulk_create([user_message for user_message, _, _ in batch])
+        unread_first, unread_second, last_message = [], [], []
+        for conversation_id, (reset_first, add_first, reset_second, add_second, last) in states.items():
+            unread_first.append(When(pk=conversation_id, then=Value(add_first) if reset_first
+                                     else F('unread_first') + add_first))
+            unread_second.append(When(pk=conversation_id, then=Value(add_second) if reset_second
+                                      else F('unread_second') + add_second))
+            last_message.append(When(pk=conversation_id, then=Value(last.id)))
+        Conversation.objects.filter(pk__in=states).update(
+            unread_first=Case(*unread_first, output_field=IntegerField()),
+            unread_second=Case(*unread_second, output_field=IntegerField()),
+            message_id=Case(*last_message),
+            updated=timezone.now(),
+        )
+
+
+message_batcher = MessageBatcher(settings.CHAT_WRITE_BATCH_SIZE, settings.CHAT_WRITE_BATCH_INTERVAL_MS / 1000)
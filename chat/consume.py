@@ -1,11 +1,13 @@
 import asyncio
 from asgiref.sync import async_to_sync
+from django.conf import settings
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.layers import get_channel_layer
 from chat.exceptions import ClientError
+from .batcher import message_batcher
+from .presence import presence
 from .util import get_conversation, get_room_name, save_message, get_con, get_messages, get_message, TYPE_JOIN, \
-    TYPE_LEAVE, TYPE_RECONNECT, get_user_with
-from asgiref.sync import sync_to_async, async_to_sync
+    TYPE_LEAVE, TYPE_RECONNECT, get_user_with, Room
 
 
 class ChatConsumer(AsyncJsonWebsocketConsumer):
@@ -37,8 +39,17 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
                 self.channel_name,
             )
             await self.accept()
-        # Store which rooms the user has joined on this connection
-        self.rooms = set()
+            await presence.connect(self.user.id, self.channel_name)
+        # Store which rooms the user has joined on this connection, keyed by conversation id
+        self.rooms = {}
+
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        """
+        Called for every frame; keeps the socket online before handing it to receive_json.
+        """
+        if hasattr(self, 'user'):
+            await presence.heartbeat(self.user.id, self.channel_name)
+        await super().receive(text_data=text_data, bytes_data=bytes_data, **kwargs)
 
     async def receive_json(self, content, **kwargs):
         """
@@ -62,6 +73,9 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
                                      content["ratio"])
             elif command == "reconnect":
                 await self.reconnect_user(content["conversation"], content["last_id"])
+            elif command == "heartbeat":
+                # Any frame refreshes presence (see receive); this one only keeps idle sockets alive.
+                pass
         except ClientError as e:
             # Catch any errors and send it back
             await self.send_json({"error": e.code})
@@ -71,11 +85,13 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         Called when the WebSocket closes for any reason.
         """
         # Leave all the rooms we are still in
-        for room_id in list(self.rooms):
-            try:
-                await self.leave_user(room_id)
-            except ClientError:
-                pass
+        self.rooms.clear()
+        if hasattr(self, 'user'):
+            await presence.disconnect(self.user.id, self.channel_name)
+            await self.channel_layer.group_discard(
+                get_room_name(self.user.id),
+                self.channel_name,
+            )
 
     # TODO Command helper methods called by receive_json
     async def join_user(self, conversation_id):
@@ -85,7 +101,7 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         try:
             room, data = await get_conversation(self.user, conversation_id)
             # Store that we're in the room
-            self.rooms.add(room)
+            self.rooms[room.id] = Room(room)
             # Instruct their client to finish opening the room
             await self.send_json({
                 "type": TYPE_JOIN,
@@ -96,24 +112,34 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
 
     # TODO Command helper methods called by receive_json
     async def reconnect_user(self, conversation_id, last_id):
-        print(last_id)
         """
-        Called by receive_json when someone sent a join command.
+        Called by receive_json when someone sent a reconnect command.
+
+        Replays the missed messages in bounded chat_reconnect frames, yielding to
+        the event loop between frames. When ``has_more`` is still set on the last
+        frame the client sends another reconnect with ``last_id`` set to ``cursor``.
         """
         try:
-            room, data = await get_conversation(self.user, conversation_id)
-            print(room, '-------------ROOM')
-            print(data, '-------------DATA')
-            self.rooms.add(room)
-            messages = await get_messages(self.user.id, last_id, room)
-            print(messages, '-----------------Message')
+            conversation, data = await get_conversation(self.user, conversation_id)
             # Store that we're in the room
-            # Instruct their client to finish opening the room
-            await self.send_json({
-                "type": TYPE_RECONNECT,
-                "conversation": data,
-                "messages": messages
-            })
+            room = self.rooms[conversation.id] = Room(conversation)
+            cursor = last_id
+            for _ in range(settings.CHAT_REPLAY_MAX_FRAMES):
+                messages, has_more = await get_messages(self.user.id, cursor, room, settings.CHAT_REPLAY_FRAME_SIZE)
+                if messages:
+                    cursor = messages[-1]['id']
+                # Instruct their client to finish opening the room
+                await self.send_json({
+                    "type": TYPE_RECONNECT,
+                    "conversation": data,
+                    "messages": messages,
+                    "has_more": has_more,
+                    "cursor": cursor,
+                })
+                if not has_more:
+                    break
+                # Let other sockets on this worker run between frames.
+                await asyncio.sleep(0)
         except Exception as e:
             raise ClientError(str(e))
 
@@ -123,9 +149,10 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         """
         try:
             # The logged-in user is in our scope thanks to the authentication ASGI middleware
-            room = sync_to_async(get_con)(self.rooms, conversation_id)
+            room = get_con(self.rooms, conversation_id)
             # Remove that we're in the room
-            self.rooms.discard(room)
+            if room is not None:
+                del self.rooms[room.id]
             # Instruct their client to finish closing the room
             await self.send_json({
                 "type": TYPE_LEAVE,
@@ -139,19 +166,20 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         """
         try:
             # Check they are in this room
-            conversation = get_con(self.rooms, conversation_id)
-            print('conversation', conversation)
-            if conversation is None:
-                room, data = await get_conversation(self.user, conversation_id)
+            room = get_con(self.rooms, conversation_id)
+            if room is None:
+                conversation, data = await get_conversation(self.user, conversation_id)
                 # Store that we're in the room
-                self.rooms.add(room)
-                conversation = get_con(self.rooms, conversation_id)
+                room = self.rooms[conversation.id] = Room(conversation)
 
-            if conversation:
+            if room:
                 # Get the room and send to the group about it
-                user_message, user_with, last_seen = await save_message(conversation, self.user, msg_type, message,
-                                                                        ratio)
-                dic = get_message(user_message, conversation.id)
+                if settings.CHAT_WRITE_BATCHING:
+                    user_message = await message_batcher.submit(room, self.user.id, msg_type, message, ratio)
+                    user_with = room.user_with(self.user.id)
+                else:
+                    user_message, user_with = await save_message(room, self.user, msg_type, message, ratio)
+                dic = get_message(user_message, room.id)
                 await self.channel_layer.group_send(
                     get_room_name(user_with),
                     get_user_with(dic, self.user.id)
@@ -189,6 +217,13 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         # Send a message down to the client
         await self.send_json(event)
 
+    async def notification_message(self, event):
+        """
+        Called when a notification is created for this user.
+        """
+        # Send a message down to the client
+        await self.send_json(event)
+
 
 def trigger_attachment_message(sender_id, receiver_id, last_seen, message):
     message = get_user_with(message, receiver_id)
@@ -0,0 +1,125 @@
+import asyncio
+import multiprocessing
+import queue
+import time
+import uuid
+from copy import deepcopy
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+
+def make_layer(config):
+    return import_string(config['BACKEND'])(**config.get('CONFIG', {}))
+
+
+def run_worker(config, user_ids, expected, timeout, ready, results):
+    """Join the ``chat_<user_id>`` groups of ``user_ids`` and count what arrives.
+
+    Runs in a spawned process, so Django is set up here before any model import.
+    """
+    import django
+    django.setup()
+    results.put(asyncio.run(consume(config, user_ids, expected, timeout, ready)))
+
+
+async def consume(config, user_ids, expected, timeout, ready):
+    from chat.util import get_room_name
+    layer = make_layer(config)
+    channel = await layer.new_channel()
+    for user_id in user_ids:
+        await layer.group_add(get_room_name(user_id), channel)
+    ready.set()
+
+    received = 0
+    while received < expected:
+        try:
+            await asyncio.wait_for(layer.receive(channel), timeout)
+        except asyncio.TimeoutError:
+            break
+        received += 1
+
+    for user_id in user_ids:
+        await layer.group_discard(get_room_name(user_id), channel)
+    return received
+
+
+async def publish(config, user_ids, messages):
+    from chat.util import get_room_name
+    layer = make_layer(config)
+    for sequence in range(messages):
+        for user_id in user_ids:
+            await layer.group_send(get_room_name(user_id), {
+                'type': 'chat.message',
+                'message': 'bench',
+                'id': sequence,
+            })
+
+
+class Command(BaseCommand):
+    help = ('Prove chat_<user_id> group delivery across worker processes and measure group_send fan-out '
+            'throughput as the process count grows. Point --hosts at Redis or any Redis-compatible server.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8],
+                            help='Process counts to benchmark.')
+        parser.add_argument('--users', type=int, default=50, help='Users (groups) joined per process.')
+        parser.add_argument('--messages', type=int, default=20, help='Messages sent to every user group.')
+        parser.add_argument('--hosts', nargs='+', help='Override the channel layer hosts, e.g. redis://127.0.0.1:6379.')
+        parser.add_argument('--timeout', type=float, default=5.0, help='Seconds a worker waits for a message.')
+        parser.add_argument('--deadline', type=float, default=120.0,
+                            help='Seconds a run may take in total before its workers are killed.')
+
+    def handle(self, *args, **options):
+        config = deepcopy(settings.CHANNEL_LAYERS['default'])
+        if options['hosts']:
+            config['BACKEND'] = 'channels_redis.core.RedisChannelLayer'
+            config.setdefault('CONFIG', {})['hosts'] = options['hosts']
+        if config['BACKEND'] == 'channels.layers.InMemoryChannelLayer':
+            self.stderr.write(self.style.WARNING(
+                'InMemoryChannelLayer cannot deliver across processes, expect 0 messages delivered.'))
+        config.setdefault('CONFIG', {}).setdefault('capacity', options['users'] * options['messages'])
+
+        failed = False
+        for processes in options['processes']:
+            delivered, expected, elapsed = self.run(config, processes, options)
+            rate = delivered / elapsed if elapsed else 0
+            self.stdout.write(f'{processes:>3} processes  {delivered}/{expected} delivered  '
+                              f'{elapsed:.3f}s  {rate:,.0f} msg/s')
+            failed = failed or delivered != expected
+        if failed:
+            raise CommandError('Some group messages were not delivered across processes.')
+
+    def run(self, config, processes, options):
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        # Fresh user ids per run so stale group memberships from earlier runs never match.
+        base = uuid.uuid4().int % 10 ** 9 * 1000
+        workers, user_ids = [], []
+        for index in range(processes):
+            owned = [base + index * options['users'] + offset for offset in range(options['users'])]
+            ready = context.Event()
+            worker = context.Process(target=run_worker, args=(
+                config, owned, len(owned) * options['messages'], options['timeout'], ready, results))
+            worker.start()
+            workers.append((worker, ready))
+            user_ids.extend(owned)
+
+        started = time.perf_counter()
+        deadline = started + options['deadline']
+        try:
+            for worker, ready in workers:
+                if not ready.wait(max(deadline - time.perf_counter(), 0)):
+                    raise CommandError('A worker process did not join its groups in time.')
+            started = time.perf_counter()
+            asyncio.run(asyncio.wait_for(publish(config, user_ids, options['messages']), options['deadline']))
+            delivered = sum(results.get(timeout=max(deadline - time.perf_counter(), 0)) for _ in workers)
+        except (queue.Empty, asyncio.TimeoutError):
+            raise CommandError(f'The run did not finish within {options["deadline"]:.0f}s.')
+        finally:
+            for worker, _ in workers:
+                worker.join(max(deadline - time.perf_counter(), 1))
+                if worker.is_alive():
+                    worker.terminate()
+        elapsed = time.perf_counter() - started
+        return delivered, len(user_ids) * options['messages'], elapsed
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-18 13:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usermessage',
+            index=models.Index(fields=['conversation', 'id'], name='chat_message_conversation_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 13:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_usermessage_conversation_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['first', '-updated', '-id'], name='chat_conversation_first_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['second', '-updated', '-id'], name='chat_conversation_second_idx'),
+        ),
+    ]
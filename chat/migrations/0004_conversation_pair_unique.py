@@ -0,0 +1,62 @@
+# Generated by Django 5.0.6 on 2026-10-18 13:31
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+from django.db.models.functions import Greatest, Least
+
+
+def merge_duplicate_conversations(apps, schema_editor):
+    """
+    Fold every conversation of a user pair into the oldest one: move the messages
+    over, add up the unread counters per participant and keep the latest activity.
+    """
+    Conversation = apps.get_model('chat', 'Conversation')
+    UserMessage = apps.get_model('chat', 'UserMessage')
+    db = schema_editor.connection.alias
+
+    pairs = Conversation.objects.using(db) \
+        .values(low=Least('first', 'second'), high=Greatest('first', 'second')) \
+        .annotate(total=Count('id')).filter(total__gt=1)
+    for pair in pairs.iterator():
+        keep, *duplicates = Conversation.objects.using(db).filter(
+            models.Q(first_id=pair['low'], second_id=pair['high']) |
+            models.Q(first_id=pair['high'], second_id=pair['low'])
+        ).order_by('timestamp', 'id')
+        duplicate_ids = [duplicate.id for duplicate in duplicates]
+        for duplicate in duplicates:
+            if duplicate.first_id == keep.first_id:
+                keep.unread_first += duplicate.unread_first
+                keep.unread_second += duplicate.unread_second
+            else:
+                keep.unread_first += duplicate.unread_second
+                keep.unread_second += duplicate.unread_first
+            keep.updated = max(keep.updated, duplicate.updated)
+
+        UserMessage.objects.using(db).filter(conversation_id__in=duplicate_ids).update(conversation_id=keep.id)
+        keep.message_id = UserMessage.objects.using(db).filter(conversation_id=keep.id).aggregate(
+            last=Max('id'))['last']
+        Conversation.objects.using(db).filter(pk=keep.pk).update(
+            unread_first=keep.unread_first,
+            unread_second=keep.unread_second,
+            message_id=keep.message_id,
+            updated=keep.updated,
+        )
+        Conversation.objects.using(db).filter(pk__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_conversation_inbox_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_conversations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Least('first', 'second'), django.db.models.functions.comparison.Greatest('first', 'second'), name='chat_conversation_pair_uniq'),
+        ),
+    ]
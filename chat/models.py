@@ -1,8 +1,9 @@
-from django.db import models
+from django.db import models, connections, transaction, IntegrityError
+from django.db.models.functions import Least, Greatest
 from user.models import User
 from django.utils import timezone
 from .choices import MassageTypeChoices
-from django.db.models import Q
+from django.db.models import Q, F, Case, When, Sum
 
 
 # Create your models here.
@@ -30,39 +31,75 @@ class ConversationManager(models.Manager):
             'id', 'message', )
         return qs
 
-    def get_or_new(self, first_id, second_id):  # get_or_create
-        if first_id == second_id:
-            return None, False
-        qlookup1 = Q(first_id=first_id) & Q(second_id=second_id)
-        qlookup2 = Q(first_id=second_id) & Q(second_id=first_id)
-        qs = self.get_queryset().filter(qlookup1 | qlookup2).distinct()
-        qs = qs.select_related('first', 'second', 'message') \
+    def inbox(self, user):
+        """
+        Conversations of ``user`` newest activity first, with the other participant
+        as ``user_with``, the user's own ``unread`` count and the last message,
+        all in one query.
+        """
+        is_first = Q(first=user)
+        return self.get_queryset().filter(is_first | Q(second=user)).exclude(first=F('second')) \
+            .select_related('first', 'second', 'message') \
             .only(
             'first__first_name',
             'first__last_name',
-            'first__id',
             'second__first_name',
             'second__last_name',
-            'second__id',
-            'unread_first',
-            'unread_second',
-            'id', 'message', )
-        if qs.count() == 1:
-            return qs.first(), False
-        elif qs.count() > 1:
-            return qs.order_by('timestamp').first(), False
-        else:
+            'message__message',
+            'message__m_type',
+            'message__user',
+            'message__timestamp',
+            'first_id', 'second_id', 'message_id', 'updated', 'id') \
+            .annotate(unread=Case(When(is_first, then=F('unread_first')), default=F('unread_second'))) \
+            .order_by('-updated', '-id')
+
+    def total_unread(self, user):
+        """Sum of the user's unread counters, read from conversation rows only."""
+        return self.get_queryset().filter(Q(first=user) | Q(second=user)).exclude(first=F('second')).aggregate(
+            total_unread=Sum(Case(When(first=user, then=F('unread_first')), default=F('unread_second')))
+        )['total_unread'] or 0
+
+    def get_or_new(self, first_id, second_id):  # get_or_create
+        """
+        Return ``(conversation, created)`` for the pair in either order. On PostgreSQL
+        this is one ``INSERT ... ON CONFLICT`` on the ordered pair key, so concurrent
+        callers always end up with the same row.
+        """
+        if first_id == second_id:
+            return None, False
+        if connections[self.db].vendor == 'postgresql':
             try:
-                if first_id != second_id:
-                    obj = self.model(
-                        first_id=first_id,
-                        second_id=second_id
-                    )
-                    obj.save()
-                    return obj, True
-            except Exception as e:
+                with transaction.atomic(using=self.db):
+                    return self._upsert_pair(first_id, second_id)
+            except IntegrityError:
                 return None, False
-            return None, False
+
+        lookup = Q(first_id=first_id, second_id=second_id) | Q(first_id=second_id, second_id=first_id)
+        conversation = self.get_queryset().filter(lookup).order_by('timestamp', 'id').first()
+        if conversation is not None:
+            return conversation, False
+        try:
+            with transaction.atomic(using=self.db):
+                return self.create(first_id=first_id, second_id=second_id), True
+        except IntegrityError:
+            return self.get_queryset().filter(lookup).first(), False
+
+    def _upsert_pair(self, first_id, second_id):
+        fields = self.model._meta.concrete_fields
+        table = self.model._meta.db_table
+        now = timezone.now()
+        sql = """
+            INSERT INTO {table} (first_id, second_id, unread_first, unread_second,
+                                 at_deleted_first, at_deleted_second, updated, timestamp)
+            VALUES (%(first)s, %(second)s, 0, 0, %(now)s, %(now)s, %(now)s, %(now)s)
+            ON CONFLICT ((LEAST(first_id, second_id)), (GREATEST(first_id, second_id)))
+            DO UPDATE SET first_id = {table}.first_id
+            RETURNING {columns}, (xmax = 0)
+        """.format(table=table, columns=', '.join(field.column for field in fields))
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, {'first': first_id, 'second': second_id, 'now': now})
+            *values, created = cursor.fetchone()
+        return self.model.from_db(self.db, [field.attname for field in fields], values), created
 
 
 class Conversation(models.Model):
@@ -77,6 +114,16 @@ class Conversation(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     objects = ConversationManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['first', '-updated', '-id'], name='chat_conversation_first_idx'),
+            models.Index(fields=['second', '-updated', '-id'], name='chat_conversation_second_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(Least('first', 'second'), Greatest('first', 'second'),
+                                    name='chat_conversation_pair_uniq'),
+        ]
+
     def __str__(self):
         return "pk {}   :   {} - {}".format(self.pk, self.first, self.second)
 
@@ -95,3 +142,8 @@ class UserMessage(models.Model):
     message = models.TextField()
     m_type = models.IntegerField(choices=MassageTypeChoices.choices, default=MassageTypeChoices.TEXT_MESSAGE)
     timestamp = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['conversation', 'id'], name='chat_message_conversation_idx'),
+        ]
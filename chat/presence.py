@@ -0,0 +1,118 @@
+import atexit
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, When, Value, DateTimeField
+from django.utils import timezone
+from api.utils import chunked
+from user.models import UserProfile
+
+
+def presence_key(user_id):
+    return 'presence:%s' % user_id
+
+
+class PresenceTracker:
+    """
+    Tracks who is online in the cache instead of the profile table.
+
+    Each user has a ``presence:<id>`` entry mapping the channel name of every open
+    socket to the time it expires, ``ttl`` seconds after its last received frame,
+    so a crashed worker cannot keep anyone online and a socket that outlives an
+    expired entry simply adds itself back. Sockets refresh their entry at most
+    every third of ``ttl``. ``last_seen`` changes are collected in memory and
+    written to ``UserProfile`` with one ``UPDATE`` every ``flush_interval`` seconds.
+    """
+
+    def __init__(self, ttl, flush_interval):
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._seen = {}
+        self._timer = None
+        self._refreshed = {}
+
+    async def connect(self, user_id, channel_name):
+        await self._update(user_id, channel_name, alive=True)
+        self.seen(user_id)
+
+    async def heartbeat(self, user_id, channel_name):
+        """Called on every frame a socket receives; only writes once the entry is a third of ``ttl`` old."""
+        if time.monotonic() - self._refreshed.get(channel_name, float('-inf')) < self.ttl / 3:
+            return
+        await self._update(user_id, channel_name, alive=True)
+        self.seen(user_id)
+
+    async def disconnect(self, user_id, channel_name):
+        await self._update(user_id, channel_name, alive=False)
+        self.seen(user_id)
+
+    async def _update(self, user_id, channel_name, alive):
+        key = presence_key(user_id)
+        now = time.time()
+        sockets = await cache.aget(key)
+        # Drops expired sockets, and counters written before sockets were tracked by name.
+        sockets = {name: expires_at for name, expires_at in sockets.items() if expires_at > now} \
+            if isinstance(sockets, dict) else {}
+        if alive:
+            sockets[channel_name] = now + self.ttl
+            self._refreshed[channel_name] = time.monotonic()
+        else:
+            sockets.pop(channel_name, None)
+            self._refreshed.pop(channel_name, None)
+        if sockets:
+            await cache.aset(key, sockets, self.ttl)
+        else:
+            await cache.adelete(key)
+
+    def online(self, user_ids):
+        """Return the subset of ``user_ids`` with at least one open socket."""
+        user_ids = set(user_ids)
+        if not user_ids:
+            return set()
+        entries = cache.get_many([presence_key(user_id) for user_id in user_ids])
+        now = time.time()
+        return {user_id for user_id in user_ids if _has_open_socket(entries.get(presence_key(user_id)), now)}
+
+    def seen(self, user_id):
+        with self._lock:
+            self._seen[user_id] = timezone.now()
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            seen, self._seen = self._seen, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if seen:
+            try:
+                for batch in chunked(seen.items(), 500):
+                    UserProfile.objects.filter(user_id__in=[user_id for user_id, _ in batch]).update(last_seen=Case(
+                        *[When(user_id=user_id, then=Value(last_seen)) for user_id, last_seen in batch],
+                        output_field=DateTimeField(),
+                    ))
+            except Exception as e:
+                print(f"Error flushing last_seen of {len(seen)} users: {e}")
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+
+def _has_open_socket(sockets, now):
+    return isinstance(sockets, dict) and any(expires_at > now for expires_at in sockets.values())
+
+
+presence = PresenceTracker(
+    ttl=settings.PRESENCE_TTL,
+    flush_interval=settings.PRESENCE_FLUSH_INTERVAL_MS / 1000,
+)
+atexit.register(presence.flush)
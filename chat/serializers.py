@@ -1,6 +1,5 @@
 from rest_framework import serializers
 from .models import UserMessage, Conversation
-from django.db.models import Q
 
 
 class UserMessageSerializer(serializers.ModelSerializer):
@@ -9,6 +8,37 @@ class UserMessageSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class InboxMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserMessage
+        fields = ['id', 'user', 'message', 'm_type', 'timestamp']
+
+
+class InboxSerializer(serializers.ModelSerializer):
+    user_with = serializers.SerializerMethodField()
+    name = serializers.SerializerMethodField()
+    unread = serializers.IntegerField(read_only=True)
+    online = serializers.SerializerMethodField()
+    message = InboxMessageSerializer(read_only=True)
+
+    class Meta:
+        model = Conversation
+        fields = ['id', 'user_with', 'name', 'online', 'unread', 'message', 'updated']
+
+    def get_other(self, obj):
+        return obj.second if obj.first_id == self.context['request'].user.id else obj.first
+
+    def get_user_with(self, obj):
+        return self.get_other(obj).id
+
+    def get_online(self, obj):
+        return self.get_other(obj).id in self.context.get('online', ())
+
+    def get_name(self, obj):
+        user = self.get_other(obj)
+        return '{first_name} {last_name}'.format(first_name=user.first_name, last_name=user.last_name)
+
+
 class ConversationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Conversation
@@ -23,11 +53,7 @@ class ConversationSerializer(serializers.ModelSerializer):
         first_user = validated_data.get('first')
         second_user = validated_data.get('second')
 
-        if Conversation.objects.filter(
-                Q(first=first_user, second=second_user) |
-                Q(first=second_user, second=first_user)
-        ).exists():
-            raise serializers.ValidationError("Conversation between these users already exists.")
-
-        conversation = Conversation.objects.create(first=first_user, second=second_user)
+        conversation, created = Conversation.objects.get_or_new(first_user.id, second_user.id)
+        if conversation is None:
+            raise serializers.ValidationError("A conversation needs two different users.")
         return conversation
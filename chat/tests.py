@@ -1,3 +1,174 @@
-from django.test import TestCase
+import asyncio
+import socket
+import threading
+import unittest
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from user.models import User
+from .batcher import MessageBatcher, write_batch
+from .models import Conversation, UserMessage
+from .presence import PresenceTracker, presence_key
 
-# Create your tests here.
+try:
+    from fakeredis import TcpFakeServer
+except ImportError:
+    TcpFakeServer = None
+
+try:
+    import channels_redis
+except ImportError:
+    channels_redis = None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@unittest.skipIf(TcpFakeServer is None or channels_redis is None, 'needs fakeredis and channels_redis')
+class ChannelLayerBenchTests(SimpleTestCase):
+    """Runs the cross-process group delivery harness against an in-process fakeredis server."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.port = free_port()
+        cls.server = TcpFakeServer(('127.0.0.1', cls.port), server_type='redis')
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def test_group_messages_reach_every_worker_process(self):
+        out = StringIO()
+        call_command('channel_layer_bench', '--hosts', f'redis://127.0.0.1:{self.port}',
+                     '--processes', '1', '2', '--users', '3', '--messages', '2',
+                     '--timeout', '2', '--deadline', '60', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('6/6 delivered', lines[0])
+        self.assertIn('12/12 delivered', lines[1])
+
+
+class RecordingWriter:
+    """Stands in for ``write_batch`` and remembers the batches it was given."""
+
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+
+    def __call__(self, batch):
+        self.batches.append([user_message.message for user_message, _, _ in batch])
+        if self.error is not None:
+            raise self.error
+        for index, (user_message, _, _) in enumerate(batch):
+            user_message.id = index + 1
+
+
+class MessageBatcherTests(SimpleTestCase):
+    room = Conversation(id=1, first_id=1, second_id=2)
+
+    def submit_all(self, batcher, writer, messages):
+        async def main():
+            with mock.patch('chat.batcher.write_batch', writer):
+                tasks = [asyncio.create_task(batcher.submit(self.room, 1, 0, message, 1)) for message in messages]
+                return await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 5)
+        return asyncio.run(main())
+
+    def test_messages_within_the_interval_share_one_write(self):
+        writer = RecordingWriter()
+        saved = self.submit_all(MessageBatcher(max_size=10, interval=0.01), writer, ['a', 'b', 'c'])
+        self.assertEqual(writer.batches, [['a', 'b', 'c']])
+        self.assertEqual([user_message.message for user_message in saved], ['a', 'b', 'c'])
+        self.assertEqual([user_message.id for user_message in saved], [1, 2, 3])
+
+    def test_full_batch_is_written_without_waiting(self):
+        writer = RecordingWriter()
+        # With a minute-long interval only reaching max_size can flush before submit_all times out.
+        self.submit_all(MessageBatcher(max_size=2, interval=60), writer, ['a', 'b', 'c', 'd'])
+        self.assertEqual(sum(writer.batches, []), ['a', 'b', 'c', 'd'])
+
+    def test_failed_write_reaches_every_sender(self):
+        writer = RecordingWriter(error=RuntimeError('down'))
+        results = self.submit_all(MessageBatcher(max_size=10, interval=0.01), writer, ['a', 'b'])
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+
+class WriteBatchTests(TestCase):
+    def setUp(self):
+        self.first = User.objects.create_user(password='password', username='first', email='first@example.com')
+        self.second = User.objects.create_user(password='password', username='second', email='second@example.com')
+        self.room = Conversation.objects.create(first=self.first, second=self.second, unread_first=4)
+
+    def message(self, user, text):
+        user_message = UserMessage(conversation=self.room, user=user, message=text)
+        return user_message, user == self.second, None
+
+    def test_batch_is_saved_in_order_with_folded_counters(self):
+        batch = [self.message(self.first, 'a'), self.message(self.first, 'b'), self.message(self.second, 'c'),
+                 self.message(self.second, 'd')]
+        with self.assertNumQueries(4):
+            write_batch(batch)
+
+        messages = list(UserMessage.objects.filter(conversation=self.room).order_by('id'))
+        self.assertEqual([user_message.message for user_message in messages], ['a', 'b', 'c', 'd'])
+        self.room.refresh_from_db()
+        # The second user replied, so only their two messages are unread for the first user.
+        self.assertEqual((self.room.unread_first, self.room.unread_second), (2, 0))
+        self.assertEqual(self.room.message_id, messages[-1].id)
+
+
+class PresenceTrackerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.tracker = PresenceTracker(ttl=90, flush_interval=60)
+        self.tracker.seen = lambda user_id: None
+
+    def at(self, seconds, action, *args):
+        with mock.patch('chat.presence.time.time', return_value=seconds), \
+                mock.patch('chat.presence.time.monotonic', return_value=seconds):
+            return asyncio.run(action(*args)) if asyncio.iscoroutinefunction(action) else action(*args)
+
+    def test_user_stays_online_until_the_last_socket_closes(self):
+        self.at(1000, self.tracker.connect, 1, 'socket-a')
+        self.at(1000, self.tracker.connect, 1, 'socket-b')
+        self.at(1001, self.tracker.disconnect, 1, 'socket-a')
+        self.assertEqual(self.at(1001, self.tracker.online, [1, 2]), {1})
+        self.at(1002, self.tracker.disconnect, 1, 'socket-b')
+        self.assertEqual(self.at(1002, self.tracker.online, [1]), set())
+        self.assertIsNone(self.at(1002, cache.get, presence_key(1)))
+
+    def test_received_frames_keep_a_socket_online(self):
+        self.at(1000, self.tracker.connect, 1, 'socket-a')
+        for seconds in range(1030, 1300, 30):
+            self.at(seconds, self.tracker.heartbeat, 1, 'socket-a')
+        self.assertEqual(self.at(1300, self.tracker.online, [1]), {1})
+        self.assertEqual(self.at(1400, self.tracker.online, [1]), set())
+
+    def test_frames_within_a_third_of_the_ttl_skip_the_cache(self):
+        self.at(1000, self.tracker.connect, 1, 'socket-a')
+        with mock.patch('chat.presence.cache.aset') as aset:
+            self.at(1029, self.tracker.heartbeat, 1, 'socket-a')
+        aset.assert_not_called()
+
+    def test_socket_is_restored_without_resetting_the_others(self):
+        self.at(1000, self.tracker.connect, 1, 'socket-a')
+        self.at(1050, self.tracker.connect, 1, 'socket-b')
+        # socket-a went quiet and expired; its next frame adds it back next to socket-b.
+        self.at(1100, self.tracker.heartbeat, 1, 'socket-a')
+        self.assertEqual(set(self.at(1100, cache.get, presence_key(1))), {'socket-a', 'socket-b'})
+        self.at(1101, self.tracker.disconnect, 1, 'socket-a')
+        self.assertEqual(self.at(1101, self.tracker.online, [1]), {1})
+
+    def test_crashed_worker_sockets_expire(self):
+        self.at(1000, self.tracker.connect, 1, 'socket-a')
+        self.at(1080, self.tracker.connect, 1, 'socket-b')
+        self.at(1100, self.tracker.disconnect, 1, 'socket-b')
+        self.assertEqual(self.at(1100, self.tracker.online, [1]), set())
@@ -3,4 +3,7 @@ from . import views
 
 urlpatterns = [
     path('conversation/', views.ConversationView.as_view(), name='conversation'),
+    path('conversation/inbox/', views.InboxView.as_view(), name='inbox'),
+    path('conversation/unread/', views.TotalUnreadView.as_view(), name='total-unread'),
+    path('online/', views.OnlineView.as_view(), name='online'),
 ]
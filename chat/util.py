@@ -1,5 +1,7 @@
 from channels.db import database_sync_to_async
+from django.db import connection, transaction
 from django.db.models import F
+from django.utils import timezone
 from rest_framework.fields import DateTimeField
 
 from chat.exceptions import ClientError
@@ -17,7 +19,7 @@ def get_message(user_message, conversation_id):
         'message': user_message.message,
         # 'image': user_message.image.url if user_message.image else None,
         'ratio': float(user_message.ratio),
-        'user': user_message.user.id,
+        'user': user_message.user_id,
         'id': user_message.id,
         'timestamp': DateTimeField().to_representation(user_message.timestamp),
         'm_type': user_message.m_type,
@@ -48,51 +50,92 @@ def get_conversation(user, conversation_id):
     return conversation, data
 
 
-def get_con(rooms, conversation_id):
-    for item in rooms:
-        print('item_id', item.id)
-        print('item', item)
-        if item.id == conversation_id:
-            return item
-    print('yes')
-    return None
+class Room:
+    """Per-connection state of a conversation the socket has joined."""
+    __slots__ = ('id', 'first_id', 'second_id')
 
+    def __init__(self, conversation):
+        self.id = conversation.id
+        self.first_id = conversation.first_id
+        self.second_id = conversation.second_id
 
-@database_sync_to_async
-def save_message(conversation, user, m_type, message, ratio):
-    message = UserMessage.objects.create(user=user, conversation_id=conversation.id, message=message,
-                                         m_type=m_type, ratio=ratio)
+    def user_with(self, user_id):
+        return self.first_id if self.second_id == user_id else self.second_id
 
-    if conversation.second_id == user.id:
-        user_with = conversation.first_id
-        last_seen = conversation.first.userprofile.last_seen
-        conversation.unread_first = F('unread_first') + 1
-        conversation.unread_second = 0
 
-    else:
-        user_with = conversation.second_id
-        conversation.unread_first = 0
-        last_seen = conversation.second.userprofile.last_seen
-        conversation.unread_second = F('unread_second') + 1
-    conversation.message = message
-    conversation.save(update_fields=['unread_first', 'unread_second', 'message'])
-    return message, user_with, last_seen
+def get_con(rooms, conversation_id):
+    """Look a joined room up by conversation id in the consumer's ``{id: Room}`` index."""
+    try:
+        return rooms.get(int(conversation_id))
+    except (TypeError, ValueError):
+        return None
+
+
+SAVE_MESSAGE_SQL = """
+WITH new_message AS (
+    INSERT INTO {message_table} (conversation_id, user_id, image, ratio, message, m_type, timestamp)
+    VALUES (%(conversation)s, %(user)s, NULL, %(ratio)s, %(message)s, %(m_type)s, %(now)s)
+    RETURNING id, timestamp
+), conversation AS (
+    UPDATE {conversation_table}
+    SET unread_first = CASE WHEN %(from_second)s THEN unread_first + 1 ELSE 0 END,
+        unread_second = CASE WHEN %(from_second)s THEN 0 ELSE unread_second + 1 END,
+        message_id = (SELECT id FROM new_message),
+        updated = %(now)s
+    WHERE id = %(conversation)s
+)
+SELECT id, timestamp FROM new_message
+""".format(message_table=UserMessage._meta.db_table, conversation_table=Conversation._meta.db_table)
+
+
+def create_message(room, user_id, m_type, message, ratio):
+    """
+    Insert a message and move the conversation's unread counters and last message
+    pointer with it, atomically. On PostgreSQL this is a single statement.
+    """
+    from_second = room.second_id == user_id
+    now = timezone.now()
+    user_message = UserMessage(conversation_id=room.id, user_id=user_id, message=message, m_type=m_type,
+                               ratio=ratio, timestamp=now)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(SAVE_MESSAGE_SQL, {
+                'conversation': room.id, 'user': user_id, 'ratio': ratio, 'message': message,
+                'm_type': m_type, 'now': now, 'from_second': from_second,
+            })
+            user_message.id, user_message.timestamp = cursor.fetchone()
+        return user_message
+
+    with transaction.atomic():
+        user_message.save(force_insert=True)
+        if from_second:
+            unread = {'unread_first': F('unread_first') + 1, 'unread_second': 0}
+        else:
+            unread = {'unread_first': 0, 'unread_second': F('unread_second') + 1}
+        Conversation.objects.filter(pk=room.id).update(message=user_message, updated=now, **unread)
+    return user_message
+
+
+@database_sync_to_async
+def save_message(room, user, m_type, message, ratio):
+    """Persist a message sent in ``room`` and return it with the id of the user to fan it out to."""
+    return create_message(room, user.id, m_type, message, ratio), room.user_with(user.id)
 
 
 @database_sync_to_async
-def get_messages(user_id, last_id, conversation):
+def get_messages(user_id, last_id, conversation, limit):
+    """Return up to ``limit`` messages after ``last_id`` and whether more are waiting."""
     messages = []
     if conversation.first_id == user_id:
-        user_with = conversation.second.id
-        print(user_with, '-----------user_with')
+        user_with = conversation.second_id
     else:
-        user_with = conversation.first
-        # print(user_with, '-----------user_with')
+        user_with = conversation.first_id
 
-    for message in UserMessage.objects.filter(conversation_id=conversation.id, id__gt=last_id).iterator():
+    queryset = UserMessage.objects.filter(conversation_id=conversation.id, id__gt=last_id).order_by('id')
+    for message in queryset[:limit + 1].iterator(chunk_size=limit + 1):
         dic = get_message(message, conversation.id)
         messages.append(get_user_with(dic, user_with))
-    return messages
+    return messages[:limit], len(messages) > limit
 
 
 def get_room_name(user_id):
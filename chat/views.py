@@ -1,7 +1,12 @@
 from .models import Conversation
-from .serializers import ConversationSerializer
-from rest_framework import generics
+from .serializers import ConversationSerializer, InboxSerializer
+from django.conf import settings
+from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from GizShare.pagination import KeysetPagination
+from .presence import presence
 
 
 class ConversationView(generics.ListCreateAPIView):
@@ -10,3 +15,48 @@ class ConversationView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         return Conversation.objects.by_user(self.request.user)
+
+
+class InboxView(generics.ListAPIView):
+    """
+    This view endpoint for the user's inbox, most recently active conversation first,
+    with the last message preview and unread count.
+    """
+    serializer_class = InboxSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return Conversation.objects.inbox(self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        user_id = request.user.id
+        online = presence.online(conversation.second_id if conversation.first_id == user_id
+                                 else conversation.first_id for conversation in page)
+        serializer = self.get_serializer(page, many=True, context={**self.get_serializer_context(), 'online': online})
+        return self.get_paginated_response(serializer.data)
+
+
+class TotalUnreadView(APIView):
+    """
+    This view endpoint for the unread message badge.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'total_unread': Conversation.objects.total_unread(request.user)})
+
+
+class OnlineView(APIView):
+    """
+    This view endpoint for which of the given users (``?ids=1,2,3``) are online right now.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            user_ids = [int(user_id) for user_id in request.query_params.get('ids', '').split(',') if user_id]
+        except ValueError:
+            return Response({'ids': 'Expected a comma separated list of user ids.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'online': sorted(presence.online(user_ids[:settings.PRESENCE_MAX_IDS]))})
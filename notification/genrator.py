@@ -1,33 +1,119 @@
+from datetime import datetime, timezone as dt_timezone
 from api.models import *
 from user.models import *
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 from .models import Notification, NotificationType
+from .push import increment_unread, push_notifications
 
-from django.contrib.contenttypes.models import ContentType
+from .render import get_content_type
 
-try:
-    USER_CONTENT_TYPE = ContentType.objects.get_for_model(User)
-    FOLLOW_CONTENT_TYPE = ContentType.objects.get_for_model(Follower)
-    POST_CONTENT_TYPE = ContentType.objects.get_for_model(Post)
-    USER_VERIFICATION_TYPE = ContentType.objects.get_for_model(UserVerification)
-except Exception as e:
-    pass
+
+def notify(**fields):
+    """Create a notification, count it as unread for the receiver and push it to their sockets."""
+    with transaction.atomic():
+        notification = Notification.objects.create(**fields)
+        increment_unread({notification.receiver_id: 1})
+    push_notifications([notification])
+    return notification
 
 
 def follow_notification(instance):
-    Notification.objects.create(sender_object_id=instance.user_id,
-                                sender_content_type=USER_CONTENT_TYPE,
-                                verb=NotificationType.FOLLOW,
-                                target_object_id=instance.id,
-                                target_content_type=FOLLOW_CONTENT_TYPE,
-                                receiver=instance.following_user)
+    notify(sender_object_id=instance.user_id,
+           sender_content_type=get_content_type(User),
+           verb=NotificationType.FOLLOW,
+           target_object_id=instance.id,
+           target_content_type=get_content_type(Follower),
+           receiver=instance.following_user)
 
 
 def user_verification_notification(instance):
-    Notification.objects.create(
+    notify(
         verb=NotificationType.USER_VERIFICATION,
-        sender_content_type=USER_CONTENT_TYPE,
+        sender_content_type=get_content_type(User),
         sender_object_id=instance.user.id,
-        target_content_type=USER_VERIFICATION_TYPE,
+        target_content_type=get_content_type(UserVerification),
         target_object_id=instance.id,
         receiver=instance.user
-    )
\ No newline at end of file
+    )
+
+
+def like_notification(instance):
+    """
+    One notification per post per ``LIKE_NOTIFICATION_WINDOW_HOURS`` window: the first
+    like creates it, later likes in the window add one to ``actor_count`` and set the
+    latest sender. A user liking again while their earlier like stands adds nothing.
+    """
+    post = instance.post
+    if post.user_id == instance.user_id:
+        return None
+    now = timezone.now()
+    group_key, since = like_group(post.id, now)
+    user_type = get_content_type(User)
+    added = 0 if Like.objects.filter(post_id=post.id, user_id=instance.user_id, created_at__gte=since) \
+        .exclude(pk=instance.pk).exists() else 1
+
+    with transaction.atomic():
+        lock_group(group_key)
+        updated = _bump_like_notification(group_key, post.user_id, instance.user_id, added, now)
+        if not updated:
+            return notify(verb=NotificationType.LIKE_POST,
+                          sender_content_type=user_type, sender_object_id=instance.user_id,
+                          target_content_type=get_content_type(Post), target_object_id=post.id,
+                          receiver_id=post.user_id, group_key=group_key)
+    notification = Notification.objects.filter(group_key=group_key).order_by('-id').first()
+    push_notifications([notification])
+    return notification
+
+
+def unlike_notification(instance):
+    """
+    Recount the likers on the current window's notification once a like is withdrawn.
+    Only unlikes pay for the exact count; likes bump ``actor_count`` by one.
+    """
+    group_key, since = like_group(instance.post_id, timezone.now())
+    Notification.objects.filter(group_key=group_key).update(
+        actor_count=Greatest(_likers(instance.post_id, since), 1))
+
+
+def lock_group(group_key):
+    """
+    Serialize writers of one aggregated notification until the transaction ends.
+    ``group_key`` is not unique (a partitioned table cannot enforce it), so this lock
+    is what keeps concurrent first likes from each inserting a row. SQLite already
+    serializes writing transactions.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))', [group_key])
+
+
+def like_group(post_id, now):
+    """``(group_key, window start)`` of the like notification window containing ``now``."""
+    seconds = settings.LIKE_NOTIFICATION_WINDOW_HOURS * 3600
+    window = int(now.timestamp()) // seconds
+    return 'like:{}:{}'.format(post_id, window), datetime.fromtimestamp(window * seconds, dt_timezone.utc)
+
+
+def _likers(post_id, since):
+    """
+    Distinct users with a standing like of the post made since ``since``, so an
+    unlike drops out and a re-like counts once.
+    """
+    return Coalesce(Subquery(
+        Like.objects.filter(post_id=post_id, created_at__gte=since).order_by().values('post_id')
+        .annotate(total=Count('user_id', distinct=True)).values('total')
+    ), 0)
+
+
+def _bump_like_notification(group_key, receiver_id, sender_id, added, now):
+    """Add ``added`` likers to an aggregated notification; a read one becomes unread again."""
+    reopened = Notification.objects.filter(group_key=group_key, is_read=True).update(
+        is_read=False, is_seen=False, read_at=None)
+    if reopened:
+        increment_unread({receiver_id: reopened})
+    return Notification.objects.filter(group_key=group_key).update(
+        actor_count=F('actor_count') + added, sender_object_id=sender_id, is_seen=False, updated_at=now)
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from notification import retention
+
+
+class Command(BaseCommand):
+    help = ('Convert the notification table to monthly range partitions on created_at, '
+            'or create the partitions of the coming months on an already partitioned table.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true',
+                            help='Rebuild the table as a partitioned table (prints the statements unless --execute).')
+        parser.add_argument('--execute', action='store_true',
+                            help='Run the conversion in one transaction instead of printing it.')
+        parser.add_argument('--months-ahead', type=int, default=settings.NOTIFICATION_PARTITION_MONTHS_AHEAD,
+                            help='Months after the current one to create partitions for.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Notification partitioning needs PostgreSQL.')
+
+        if not options['convert']:
+            if not retention.is_partitioned():
+                raise CommandError('The notification table is not partitioned yet, run with --convert first.')
+            created = retention.ensure_partitions(options['months_ahead'])
+            self.stdout.write(self.style.SUCCESS(f'Created {created} notification partitions.'))
+            return
+
+        if retention.is_partitioned():
+            raise CommandError('The notification table is already partitioned.')
+        statements = retention.convert_sql(options['months_ahead'])
+        if not options['execute']:
+            self.stdout.write('BEGIN;')
+            for statement in statements:
+                self.stdout.write(f'{statement};')
+            self.stdout.write('COMMIT;')
+            return
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('LOCK TABLE {} IN ACCESS EXCLUSIVE MODE'.format(connection.ops.quote_name(retention.TABLE)))
+            for statement in statements:
+                cursor.execute(statement)
+        self.stdout.write(self.style.SUCCESS(
+            f'Partitioned the notification table; the old rows are kept in {retention.LEGACY_TABLE}. '
+            'Set NOTIFICATION_PARTITIONED=True so retention drops whole months.'))
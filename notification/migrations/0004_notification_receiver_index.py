@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-18 13:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notification', '0003_alter_notification_verb'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='verb',
+            field=models.IntegerField(choices=[(1, 'Follow'), (2, 'New Post'), (3, 'Like Post'), (4, 'User Verification')], help_text=[(1, 'Follow'), (2, 'New Post'), (3, 'Like Post'), (4, 'User Verification')], null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['receiver', '-created_at', '-id'], name='notification_receiver_idx'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.0.6 on 2026-10-18 13:42
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Q
+
+
+BATCH_SIZE = 5000
+
+
+def backfill_read_state(apps, schema_editor):
+    """
+    Every receiver keeps its newest ``unread`` (the badge count) notifications
+    unread and has the rest marked read; the counter is then set to what was kept.
+    The migration is not atomic, so each batched UPDATE commits on its own and
+    no statement locks the whole table.
+    """
+    Notification = apps.get_model('notification', 'Notification')
+    NotificationCounter = apps.get_model('notification', 'NotificationCounter')
+    read = {'is_read': True, 'is_seen': True, 'read_at': F('updated_at')}
+
+    pending = NotificationCounter.objects.filter(unread__gt=0)
+    last_id = Notification.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        Notification.objects.filter(id__gte=start, id__lt=start + BATCH_SIZE) \
+            .exclude(receiver_id__in=pending.values('receiver_id')).update(**read)
+
+    for counter in pending.order_by('receiver_id').iterator():
+        rows = Notification.objects.filter(receiver_id=counter.receiver_id)
+        newest = rows.order_by('-created_at', '-id').values_list('created_at', 'id')
+        cutoff = newest[counter.unread - 1:counter.unread].first()
+        if cutoff is not None:
+            created_at, pk = cutoff
+            older = rows.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk), is_read=False)
+            while True:
+                batch = list(older.values_list('id', flat=True)[:BATCH_SIZE])
+                if not batch:
+                    break
+                Notification.objects.filter(id__in=batch).update(**read)
+        NotificationCounter.objects.filter(pk=counter.pk).update(unread=rows.filter(is_read=False).count())
+
+
+class Migration(migrations.Migration):
+    # The backfill commits batch by batch instead of holding one transaction over the table.
+    atomic = False
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notification', '0006_notification_grouping'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='is_read',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='is_seen',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_read_state, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['receiver', '-created_at', '-id'], name='notification_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', True)), fields=['read_at'], name='notification_read_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['created_at'], name='notification_created_idx'),
+        ),
+    ]
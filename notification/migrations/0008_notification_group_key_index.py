@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 14:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0007_notification_lifecycle'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='group_key',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from user.models import User
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
@@ -32,3 +33,35 @@ class Notification(TimeAt):
     target = GenericForeignKey('target_content_type', 'target_object_id')
 
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_notifications')
+
+    # Aggregated notifications (e.g. likes of one post in one window) share a group key;
+    # ``sender`` is the latest actor and ``actor_count`` counts all of them. The key is
+    # not unique because a partitioned table cannot enforce it; writers of one group
+    # serialize on ``genrator.lock_group`` instead.
+    group_key = models.CharField(max_length=100, null=True, blank=True, db_index=True)
+    actor_count = models.PositiveIntegerField(default=1)
+
+    # ``is_seen`` is set once the notification was listed to the receiver, ``is_read`` once it was opened.
+    is_seen = models.BooleanField(default=False)
+    is_read = models.BooleanField(default=False)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['receiver', '-created_at', '-id'], name='notification_receiver_idx'),
+            models.Index(fields=['receiver', '-created_at', '-id'], condition=Q(is_read=False),
+                         name='notification_unread_idx'),
+            models.Index(fields=['read_at'], condition=Q(is_read=True), name='notification_read_at_idx'),
+            models.Index(fields=['created_at'], name='notification_created_idx'),
+        ]
+
+
+class NotificationCounter(models.Model):
+    """Unread notifications of one receiver, so badge reads never touch the notification table."""
+    receiver = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                    related_name='notification_counter')
+    unread = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(verbose_name="Updated At", auto_now=True)
+
+    def __str__(self):
+        return '{} - {}'.format(self.receiver_id, self.unread)
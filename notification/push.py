@@ -0,0 +1,84 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from chat.util import get_room_name
+from .models import Notification, NotificationCounter
+
+TYPE_NOTIFICATION = 'notification_message'
+
+
+def increment_unread(counts):
+    """
+    Add ``{receiver_id: n}`` to the receivers' unread counters, creating missing counters.
+    Negative counts decrement and never take a counter below zero.
+    """
+    NotificationCounter.objects.bulk_create([
+        NotificationCounter(receiver_id=receiver_id) for receiver_id in counts
+    ], ignore_conflicts=True)
+    receivers_by_count = {}
+    for receiver_id, count in counts.items():
+        receivers_by_count.setdefault(count, []).append(receiver_id)
+    for count, receiver_ids in receivers_by_count.items():
+        NotificationCounter.objects.filter(receiver_id__in=receiver_ids) \
+            .update(unread=Greatest(F('unread') + count, 0), updated_at=timezone.now())
+
+
+def get_unread(receiver_id):
+    return NotificationCounter.objects.filter(receiver_id=receiver_id).values_list('unread', flat=True).first() or 0
+
+
+def reset_unread(receiver_id):
+    NotificationCounter.objects.filter(receiver_id=receiver_id).update(unread=0, updated_at=timezone.now())
+
+
+def mark_read(receiver_id, ids=None):
+    """
+    Mark the receiver's notifications with ``ids`` (all of them when ``None``) as read
+    and take them off the unread counter. Returns the remaining unread count.
+    """
+    notifications = Notification.objects.filter(receiver_id=receiver_id, is_read=False)
+    if ids is not None:
+        notifications = notifications.filter(id__in=ids)
+    with transaction.atomic():
+        marked = notifications.update(is_read=True, is_seen=True, read_at=timezone.now())
+        if ids is None:
+            reset_unread(receiver_id)
+        elif marked:
+            increment_unread({receiver_id: -marked})
+    return get_unread(receiver_id)
+
+
+def mark_seen(receiver_id, ids=None):
+    """Mark the receiver's notifications with ``ids`` (all of them when ``None``) as seen."""
+    notifications = Notification.objects.filter(receiver_id=receiver_id, is_seen=False)
+    if ids is not None:
+        notifications = notifications.filter(id__in=ids)
+    return notifications.update(is_seen=True)
+
+
+def push_notifications(notifications):
+    """
+    Send each notification to its receiver's open sockets (the per-user ``chat_<id>``
+    group) once the surrounding transaction commits.
+    """
+    from .serializers import NotificationListSerializer
+    notifications = list(notifications)
+    # One serializer for the batch, so senders and targets are loaded once per content type.
+    data = NotificationListSerializer(notifications, many=True).data
+    messages = [(notification.receiver_id, item) for notification, item in zip(notifications, data)]
+
+    def send():
+        channel_layer = get_channel_layer()
+        for receiver_id, data in messages:
+            try:
+                async_to_sync(channel_layer.group_send)(get_room_name(receiver_id), {
+                    'type': TYPE_NOTIFICATION,
+                    'notification': data,
+                })
+            except Exception as e:
+                print(f"Error pushing notification to user {receiver_id}: {e}")
+
+    transaction.on_commit(send)
@@ -0,0 +1,72 @@
+from django.contrib.contenttypes.models import ContentType
+from .models import Notification, NotificationType
+
+# Extra relations loaded with the generic objects of a model, keyed by "app_label.model".
+RELATED = {
+    'user.user': {'select_related': ('userprofile',)},
+    'api.post': {'only': ('id', 'title', 'user_id')},
+    'user.userverification': {'only': ('id', 'user_id', 'status')},
+}
+
+GENERIC_FIELDS = ('sender', 'target')
+
+
+def get_content_type(model):
+    """ContentType of a model, from Django's per-process content type cache after the first lookup."""
+    return ContentType.objects.get_for_model(model)
+
+
+def load_generic(notifications):
+    """
+    Resolve the ``sender`` and ``target`` of a page of notifications with one query
+    per content type and store them in each notification's GenericForeignKey cache,
+    so reading ``notification.sender``/``.target`` afterwards costs no query.
+    """
+    wanted = {}
+    for notification in notifications:
+        for name in GENERIC_FIELDS:
+            field = Notification._meta.get_field(name)
+            content_type_id = getattr(notification, field.ct_field + '_id')
+            object_id = getattr(notification, field.fk_field)
+            if content_type_id and object_id:
+                wanted.setdefault(content_type_id, set()).add(object_id)
+
+    loaded = {}
+    for content_type_id, object_ids in wanted.items():
+        content_type = ContentType.objects.get_for_id(content_type_id)
+        model = content_type.model_class()
+        if model is None:
+            continue
+        queryset = model._default_manager.all()
+        related = RELATED.get('{}.{}'.format(content_type.app_label, content_type.model), {})
+        if 'select_related' in related:
+            queryset = queryset.select_related(*related['select_related'])
+        if 'only' in related:
+            queryset = queryset.only(*related['only'])
+        for obj in queryset.filter(pk__in=object_ids):
+            loaded[content_type_id, obj.pk] = obj
+
+    for notification in notifications:
+        for name in GENERIC_FIELDS:
+            field = Notification._meta.get_field(name)
+            key = (getattr(notification, field.ct_field + '_id'), getattr(notification, field.fk_field))
+            field.set_cached_value(notification, loaded.get(key))
+    return notifications
+
+
+def render_message(notification):
+    """Human readable text of a notification whose sender has been loaded."""
+    sender = notification.sender
+    name = getattr(sender, 'username', None) or 'Someone'
+    others = notification.actor_count - 1
+    if notification.verb == NotificationType.FOLLOW:
+        return '{} started following you'.format(name)
+    if notification.verb == NotificationType.NEW_POST:
+        return '{} shared a new post'.format(name)
+    if notification.verb == NotificationType.LIKE_POST:
+        if others > 0:
+            return '{} and {} other{} liked your post'.format(name, others, 's' if others > 1 else '')
+        return '{} liked your post'.format(name)
+    if notification.verb == NotificationType.USER_VERIFICATION:
+        return 'Your verification request was updated'
+    return ''
@@ -0,0 +1,192 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+from .models import Notification
+from .push import increment_unread
+
+TABLE = Notification._meta.db_table
+LEGACY_TABLE = TABLE + '_legacy'
+
+
+def _delete_batches(queryset, batch_size, max_batches):
+    """
+    Delete ``queryset`` in batches of primary keys so no single statement holds
+    locks for long, taking deleted unread rows off their receivers' counters.
+    """
+    total = 0
+    for _ in range(max_batches):
+        rows = list(queryset.values_list('id', 'receiver_id', 'is_read')[:batch_size])
+        if not rows:
+            break
+        unread = Counter(receiver_id for _, receiver_id, is_read in rows if not is_read)
+        with transaction.atomic():
+            Notification.objects.filter(id__in=[pk for pk, _, _ in rows]).delete()
+            if unread:
+                increment_unread({receiver_id: -count for receiver_id, count in unread.items()})
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+    return total
+
+
+def purge_read(before, batch_size=None, max_batches=None):
+    """Delete notifications that were read before ``before``."""
+    return _delete_batches(Notification.objects.filter(is_read=True, read_at__lt=before),
+                           batch_size or settings.NOTIFICATION_RETENTION_BATCH_SIZE,
+                           max_batches or settings.NOTIFICATION_RETENTION_MAX_BATCHES)
+
+
+def purge_expired(before, batch_size=None, max_batches=None):
+    """Delete every notification created before ``before``, read or not."""
+    return _delete_batches(Notification.objects.filter(created_at__lt=before),
+                           batch_size or settings.NOTIFICATION_RETENTION_BATCH_SIZE,
+                           max_batches or settings.NOTIFICATION_RETENTION_MAX_BATCHES)
+
+
+def apply_retention():
+    """
+    Run the retention policy once. On a partitioned table whole expired months are
+    dropped and the next months are created ahead; otherwise expired rows are deleted
+    in batches like read ones.
+    """
+    now = timezone.now()
+    result = {'read': purge_read(now - timedelta(days=settings.NOTIFICATION_READ_RETENTION_DAYS))}
+    expire_before = now - timedelta(days=settings.NOTIFICATION_MAX_AGE_DAYS)
+    if settings.NOTIFICATION_PARTITIONED:
+        result['partitions_dropped'] = drop_partitions(expire_before)
+        result['partitions_created'] = ensure_partitions(settings.NOTIFICATION_PARTITION_MONTHS_AHEAD)
+    else:
+        result['expired'] = purge_expired(expire_before)
+    return result
+
+
+# Time-range partitioning (PostgreSQL). Notifications are split into one partition
+# per calendar month (UTC) of ``created_at``, named ``<table>_pYYYYMM``.
+
+def month_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month):
+    return '{}_p{:%Y%m}'.format(TABLE, month)
+
+
+def create_partition_sql(month):
+    return "CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM ('{}') TO ('{}')".format(
+        connection.ops.quote_name(partition_name(month)), connection.ops.quote_name(TABLE),
+        month.isoformat(), add_months(month, 1).isoformat())
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [TABLE])
+        return cursor.fetchone() is not None
+
+
+def partitions():
+    """``{month: name}`` of the existing monthly partitions."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+        """, [TABLE])
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = TABLE + '_p'
+    return {datetime.strptime(name[len(prefix):], '%Y%m').replace(tzinfo=dt_timezone.utc): name
+            for name in names if name.startswith(prefix)}
+
+
+def ensure_partitions(months_ahead):
+    """Create the partitions of the current month and ``months_ahead`` following months."""
+    if not is_partitioned():
+        return 0
+    existing = partitions()
+    current = month_start(timezone.now())
+    missing = [add_months(current, count) for count in range(months_ahead + 1)
+               if add_months(current, count) not in existing]
+    with connection.cursor() as cursor:
+        for month in missing:
+            cursor.execute(create_partition_sql(month))
+    return len(missing)
+
+
+def drop_partitions(before):
+    """
+    Drop the partitions that only hold rows created before ``before``. Their unread
+    rows are taken off the receivers' counters first, with one grouped query each.
+    """
+    if not is_partitioned():
+        return 0
+    dropped = 0
+    for month, name in sorted(partitions().items()):
+        if add_months(month, 1) > before:
+            continue
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT receiver_id, COUNT(*) FROM {} WHERE NOT is_read GROUP BY receiver_id".format(
+                connection.ops.quote_name(name)))
+            unread = {receiver_id: -count for receiver_id, count in cursor.fetchall()}
+            cursor.execute("DROP TABLE {}".format(connection.ops.quote_name(name)))
+            if unread:
+                increment_unread(unread)
+        dropped += 1
+    return dropped
+
+
+def convert_sql(months_ahead):
+    """
+    Statements that turn the notification table into a table range-partitioned by
+    ``created_at``, keeping the same name, columns and indexes. A partitioned table
+    can only enforce keys that contain the partition column, so the primary key
+    becomes ``(id, created_at)``; ``group_key`` is only indexed, as in the model.
+    The old table is kept as ``<table>_legacy`` until it is dropped by hand.
+    """
+    quote = connection.ops.quote_name
+    table, legacy = quote(TABLE), quote(LEGACY_TABLE)
+    statements = [
+        'ALTER TABLE {} RENAME TO {}'.format(table, legacy),
+        *['ALTER INDEX {} RENAME TO {}'.format(quote(index.name), quote(index.name + '_legacy'))
+          for index in Notification._meta.indexes],
+        'CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS) '
+        'PARTITION BY RANGE (created_at)'.format(table, legacy),
+        'ALTER TABLE {} ADD PRIMARY KEY (id, created_at)'.format(table),
+    ]
+    for field in Notification._meta.concrete_fields:
+        if field.remote_field:
+            statements.append(
+                'ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {target} ({target_column}) '
+                'DEFERRABLE INITIALLY DEFERRED'.format(
+                    table=table, name=quote('{}_{}_fk'.format(TABLE, field.column)), column=quote(field.column),
+                    target=quote(field.related_model._meta.db_table),
+                    target_column=quote(field.target_field.column)))
+        if field.db_index or field.unique or field.remote_field:
+            if not field.primary_key:
+                statements.append('CREATE INDEX {} ON {} ({})'.format(
+                    quote('{}_{}_idx'.format(TABLE, field.column)), table, quote(field.column)))
+    with connection.schema_editor(collect_sql=True) as schema_editor:
+        statements.extend(str(index.create_sql(Notification, schema_editor)) for index in Notification._meta.indexes)
+
+    oldest = Notification.objects.aggregate(oldest=Min('created_at'))['oldest']
+    current = month_start(timezone.now())
+    month = month_start(oldest) if oldest else current
+    while month <= add_months(current, months_ahead):
+        statements.append(create_partition_sql(month))
+        month = add_months(month, 1)
+
+    statements += [
+        'INSERT INTO {} SELECT * FROM {}'.format(table, legacy),
+        "SELECT setval(pg_get_serial_sequence('{}', 'id'), (SELECT COALESCE(MAX(id), 0) + 1 FROM {}), false)".format(
+            TABLE, table),
+    ]
+    return statements
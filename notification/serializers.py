@@ -1,8 +1,58 @@
+from django.contrib.contenttypes.models import ContentType
 from rest_framework import serializers
 from .models import Notification
+from .render import load_generic, render_message
+
+
+class NotificationRenderListSerializer(serializers.ListSerializer):
+    """Bulk-loads senders and targets of the whole page before rendering its items."""
+
+    def to_representation(self, data):
+        notifications = list(data.all() if hasattr(data, 'all') else data)
+        load_generic(notifications)
+        return super().to_representation(notifications)
 
 
 class NotificationListSerializer(serializers.ModelSerializer):
+    sender = serializers.SerializerMethodField()
+    target = serializers.SerializerMethodField()
+    message = serializers.SerializerMethodField()
+
     class Meta:
         model = Notification
-        fields = ['id', 'sender_object_id', 'receiver_id']
+        fields = ['id', 'verb', 'sender_object_id', 'receiver_id', 'actor_count', 'sender', 'target', 'message',
+                  'is_seen', 'is_read', 'read_at', 'created_at', 'updated_at']
+        list_serializer_class = NotificationRenderListSerializer
+
+    def to_representation(self, instance):
+        if not self.parent:
+            load_generic([instance])
+        return super().to_representation(instance)
+
+    def get_sender(self, obj):
+        sender = obj.sender
+        if sender is None:
+            return None
+        profile = getattr(sender, 'userprofile', None)
+        return {
+            'id': sender.pk,
+            'username': sender.username,
+            'name': ' '.join(filter(None, [sender.first_name, sender.last_name])),
+            'picture': profile.picture.url if profile and profile.picture else None,
+        }
+
+    def get_target(self, obj):
+        target = obj.target
+        if target is None:
+            return None
+        data = {'type': ContentType.objects.get_for_id(obj.target_content_type_id).model, 'id': target.pk}
+        if hasattr(target, 'title'):
+            data['title'] = target.title
+        return data
+
+    def get_message(self, obj):
+        return render_message(obj)
+
+
+class NotificationIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=1000)
@@ -0,0 +1,46 @@
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from api.models import Follower, Post
+from api.utils import chunked
+from user.models import User
+from .models import Notification, NotificationType
+from .push import increment_unread, push_notifications
+from .render import get_content_type
+from .retention import apply_retention
+
+
+@shared_task
+def send_new_post_notifications(post_id):
+    try:
+        post = Post.objects.only('id', 'user_id').get(id=post_id)
+    except Post.DoesNotExist:
+        print(f"Post with ID {post_id} does not exist.")
+        return 0
+
+    user_type = get_content_type(User)
+    post_type = get_content_type(Post)
+    followers = Follower.objects.filter(following_user_id=post.user_id).exclude(user_id=post.user_id) \
+        .values_list('user_id', flat=True).distinct().iterator(chunk_size=settings.NOTIFICATION_BATCH_SIZE)
+    total = 0
+    for receiver_ids in chunked(followers, settings.NOTIFICATION_BATCH_SIZE):
+        with transaction.atomic():
+            notifications = Notification.objects.bulk_create([
+                Notification(verb=NotificationType.NEW_POST,
+                             sender_content_type=user_type, sender_object_id=post.user_id,
+                             target_content_type=post_type, target_object_id=post.id,
+                             receiver_id=receiver_id)
+                for receiver_id in receiver_ids
+            ])
+            increment_unread(dict.fromkeys(receiver_ids, 1))
+        push_notifications(notifications)
+        total += len(notifications)
+    print(f"New post {post_id} notified {total} followers")
+    return total
+
+
+@shared_task
+def purge_notifications():
+    result = apply_retention()
+    print(f"Notification retention: {result}")
+    return result
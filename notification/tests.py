@@ -1,3 +1,196 @@
-from django.test import TestCase
+import importlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from api.models import Category, Like, Post
+from user.models import User
+from .genrator import like_notification, unlike_notification
+from .models import Notification, NotificationCounter, NotificationType
+from .push import get_unread, increment_unread, mark_read, push_notifications
+from .render import get_content_type
+from .retention import add_months, apply_retention, month_start, partition_name, purge_expired, purge_read
 
-# Create your tests here.
+lifecycle_migration = importlib.import_module('notification.migrations.0007_notification_lifecycle')
+
+
+def make_user(name):
+    return User.objects.create_user(password='password', username=name, email=f'{name}@example.com')
+
+
+class LikeNotificationTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author')
+        self.likers = [make_user(f'liker{i}') for i in range(3)]
+        self.post = Post.objects.create(user=self.author, category=Category.objects.create(name='articles'))
+
+    def like(self, user):
+        like = Like.objects.create(user=user, post=self.post)
+        like_notification(like)
+        return like
+
+    def unlike(self, like):
+        like.delete()
+        unlike_notification(like)
+
+    def notification(self):
+        notifications = list(Notification.objects.filter(receiver=self.author))
+        self.assertEqual(len(notifications), 1)
+        return notifications[0]
+
+    def test_likes_in_a_window_share_one_notification(self):
+        for user in self.likers:
+            self.like(user)
+        notification = self.notification()
+        self.assertEqual(notification.actor_count, 3)
+        self.assertEqual(notification.sender_object_id, self.likers[-1].id)
+        self.assertEqual(get_unread(self.author.id), 1)
+
+    def test_unlike_and_relike_count_the_liker_once(self):
+        self.like(self.likers[0])
+        like = self.like(self.likers[1])
+        self.unlike(like)
+        self.assertEqual(self.notification().actor_count, 1)
+        self.like(self.likers[1])
+        self.like(self.likers[1]).delete()
+        self.assertEqual(self.notification().actor_count, 2)
+
+    def test_likes_bump_the_count_without_recounting(self):
+        self.like(self.likers[0])
+        with CaptureQueriesContext(connection) as queries:
+            self.like(self.likers[1])
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql'].upper()])
+        self.assertEqual(self.notification().actor_count, 2)
+
+    def test_new_like_reopens_a_read_notification(self):
+        self.like(self.likers[0])
+        mark_read(self.author.id)
+        self.like(self.likers[1])
+        notification = self.notification()
+        self.assertFalse(notification.is_read)
+        self.assertEqual(get_unread(self.author.id), 1)
+
+    def test_own_likes_are_not_notified(self):
+        self.assertIsNone(like_notification(Like.objects.create(user=self.author, post=self.post)))
+        self.assertFalse(Notification.objects.exists())
+
+
+class PushNotificationTests(TestCase):
+    def setUp(self):
+        self.receiver = make_user('receiver')
+        self.post = Post.objects.create(user=self.receiver, category=Category.objects.create(name='articles'))
+
+    def make_notifications(self, prefix, count):
+        senders = [make_user(f'{prefix}{index}') for index in range(count)]
+        return [Notification.objects.create(
+            verb=NotificationType.LIKE_POST, receiver=self.receiver,
+            sender_content_type=get_content_type(User), sender_object_id=sender.id,
+            target_content_type=get_content_type(Post), target_object_id=self.post.id,
+        ) for sender in senders]
+
+    def push(self, notifications):
+        with CaptureQueriesContext(connection) as queries, \
+                mock.patch('notification.push.get_channel_layer') as get_channel_layer, \
+                self.captureOnCommitCallbacks(execute=True):
+            get_channel_layer.return_value.group_send = mock.AsyncMock()
+            push_notifications(notifications)
+        return len(queries), get_channel_layer.return_value.group_send.call_args_list
+
+    def test_batch_is_serialized_with_one_query_per_content_type(self):
+        single, _ = self.push(self.make_notifications('single', 1))
+        notifications = self.make_notifications('batch', 5)
+        batch, sent = self.push(notifications)
+        self.assertEqual(batch, single)
+        self.assertEqual([call.args[1]['notification']['id'] for call in sent],
+                         [notification.id for notification in notifications])
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        self.receiver = make_user('receiver')
+        self.now = datetime(2026, 3, 15, 12, tzinfo=dt_timezone.utc)
+
+    def make(self, count, days_old, read=False):
+        created_at = self.now - timedelta(days=days_old)
+        notifications = Notification.objects.bulk_create([Notification(
+            verb=NotificationType.FOLLOW, receiver=self.receiver, created_at=created_at,
+            is_read=read, is_seen=read, read_at=created_at if read else None,
+        ) for _ in range(count)])
+        if not read:
+            increment_unread({self.receiver.id: count})
+        return notifications
+
+    def test_purge_read_keeps_unread_and_recent(self):
+        self.make(3, days_old=40, read=True)
+        recent = self.make(1, days_old=1, read=True)
+        unread = self.make(2, days_old=40)
+        self.assertEqual(purge_read(self.now - timedelta(days=30)), 3)
+        self.assertEqual(set(Notification.objects.values_list('id', flat=True)),
+                         {notification.id for notification in recent + unread})
+        self.assertEqual(get_unread(self.receiver.id), 2)
+
+    def test_purge_expired_takes_unread_off_the_counter(self):
+        self.make(2, days_old=100, read=True)
+        self.make(3, days_old=100)
+        self.make(1, days_old=1)
+        self.assertEqual(purge_expired(self.now - timedelta(days=90)), 5)
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(get_unread(self.receiver.id), 1)
+
+    def test_batches_stop_at_max_batches(self):
+        self.make(5, days_old=100)
+        self.assertEqual(purge_expired(self.now - timedelta(days=90), batch_size=2, max_batches=2), 4)
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(get_unread(self.receiver.id), 1)
+
+    @override_settings(NOTIFICATION_PARTITIONED=False, NOTIFICATION_READ_RETENTION_DAYS=30,
+                       NOTIFICATION_MAX_AGE_DAYS=90)
+    def test_apply_retention_deletes_rows_when_not_partitioned(self):
+        self.make(2, days_old=40, read=True)
+        self.make(1, days_old=100)
+        self.make(1, days_old=1)
+        with mock.patch('notification.retention.timezone.now', return_value=self.now):
+            self.assertEqual(apply_retention(), {'read': 2, 'expired': 1})
+        self.assertEqual(get_unread(self.receiver.id), 1)
+
+    def test_month_helpers(self):
+        month = month_start(datetime(2026, 12, 31, 23, 30, tzinfo=dt_timezone(timedelta(hours=-5))))
+        self.assertEqual(month, datetime(2027, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(add_months(month, -1), datetime(2026, 12, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(add_months(month, 13), datetime(2028, 2, 1, tzinfo=dt_timezone.utc))
+        self.assertTrue(partition_name(month).endswith('_p202701'))
+
+
+class BackfillReadStateTests(TestCase):
+    def setUp(self):
+        self.start = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+    def receiver(self, name, rows, unread):
+        user = make_user(name)
+        Notification.objects.bulk_create([Notification(
+            verb=NotificationType.FOLLOW, receiver=user, created_at=self.start + timedelta(hours=hour),
+            updated_at=self.start + timedelta(hours=hour),
+        ) for hour in range(rows)])
+        NotificationCounter.objects.create(receiver=user, unread=unread)
+        return user
+
+    def unread(self, user):
+        return list(Notification.objects.filter(receiver=user, is_read=False)
+                    .order_by('created_at').values_list('created_at', flat=True))
+
+    def test_keeps_the_newest_unread_per_receiver(self):
+        partly = self.receiver('partly', rows=5, unread=2)
+        caught_up = self.receiver('caught_up', rows=3, unread=0)
+        behind = self.receiver('behind', rows=2, unread=7)
+        with mock.patch.object(lifecycle_migration, 'BATCH_SIZE', 2):
+            lifecycle_migration.backfill_read_state(apps, None)
+
+        self.assertEqual(self.unread(partly), [self.start + timedelta(hours=3), self.start + timedelta(hours=4)])
+        self.assertEqual(self.unread(caught_up), [])
+        self.assertEqual(len(self.unread(behind)), 2)
+        self.assertEqual([get_unread(user.id) for user in (partly, caught_up, behind)], [2, 0, 2])
+        read = Notification.objects.filter(receiver=partly, is_read=True).first()
+        self.assertTrue(read.is_seen)
+        self.assertEqual(read.read_at, read.updated_at)
@@ -3,4 +3,7 @@ from . import views
 
 urlpatterns = [
     path('notification/', views.NotiFicationView.as_view(), name='notification'),
+    path('notification/unread/', views.UnreadNotificationView.as_view(), name='notification-unread'),
+    path('notification/read/', views.ReadNotificationView.as_view(), name='notification-read'),
+    path('notification/seen/', views.SeenNotificationView.as_view(), name='notification-seen'),
 ]
@@ -1,7 +1,11 @@
 from .models import Notification
-from .serializers import NotificationListSerializer
+from .serializers import NotificationListSerializer, NotificationIdsSerializer
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .push import get_unread, mark_read, mark_seen
+from GizShare.pagination import KeysetPagination
 
 
 # Create your views here.
@@ -9,6 +13,40 @@ class NotiFicationView(generics.ListAPIView):
     """This view endpoint for listing user notification"""
     serializer_class = NotificationListSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return Notification.objects.filter(receiver=self.request.user)
+        queryset = Notification.objects.filter(receiver=self.request.user)
+        if self.request.query_params.get('unread') in ('1', 'true', 'True'):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+
+class UnreadNotificationView(APIView):
+    """This view endpoint for the unread notification badge, served from the per-user counter"""
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        return Response({'unread': get_unread(request.user.id)})
+
+
+class ReadNotificationView(APIView):
+    """This view endpoint for marking the given ``ids`` (or all) of the user's notifications as read"""
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = NotificationIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        unread = mark_read(request.user.id, serializer.validated_data.get('ids'))
+        return Response({'unread': unread})
+
+
+class SeenNotificationView(APIView):
+    """This view endpoint for marking the given ``ids`` (or all) of the user's notifications as seen"""
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = NotificationIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        seen = mark_seen(request.user.id, serializer.validated_data.get('ids'))
+        return Response({'seen': seen})
@@ -0,0 +1,105 @@
+import asyncio
+import copy
+import threading
+import time
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .models import User
+
+
+@sync_to_async
+def load_user(user_id):
+    try:
+        return User.objects.select_related('userprofile').get(id=user_id)
+    except User.DoesNotExist:
+        return None
+
+
+class UserSnapshotCache:
+    """
+    Per-process LRU cache, with a TTL, of the users resolved by WebSocket handshakes.
+
+    Concurrent lookups of the same uncached user share one in-flight query,
+    so a reconnect storm after a deploy costs one query per user instead of
+    one per socket. Entries are dropped on ``User``/``UserProfile`` save in
+    this process; saves made by other processes are picked up within ``ttl``.
+    The cached user is never handed out: every handshake gets its own copy, so
+    changes and related objects loaded on one connection stay on that connection.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    async def get(self, user_id):
+        with self._lock:
+            user = self._lookup(user_id)
+            if user is not None:
+                return copy.deepcopy(user)
+            future = self._in_flight.get(user_id)
+            owner = future is None
+            if owner:
+                future = asyncio.get_running_loop().create_future()
+                self._in_flight[user_id] = future
+
+        if not owner:
+            try:
+                return copy.deepcopy(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                # The owner was cancelled before the user loaded; retry unless this task was cancelled too.
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                return await self.get(user_id)
+
+        try:
+            user = await load_user(user_id)
+            with self._lock:
+                # A save invalidated the user while it was loading, so don't cache the stale copy.
+                if self._in_flight.get(user_id) is future and user is not None:
+                    self._store(user_id, user)
+            future.set_result(user)
+            return copy.deepcopy(user)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                if self._in_flight.get(user_id) is future:
+                    del self._in_flight[user_id]
+            if not future.done():
+                # Cancelled mid-load: release the waiters instead of leaving them hanging.
+                future.cancel()
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._in_flight.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return user
+
+    def _store(self, user_id, user):
+        self._entries[user_id] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+user_snapshot_cache = UserSnapshotCache(max_size=settings.WS_USER_CACHE_SIZE, ttl=settings.WS_USER_CACHE_TTL)
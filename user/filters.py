@@ -0,0 +1,15 @@
+from rest_framework.filters import SearchFilter
+from .search import search_profiles
+
+
+class UserProfileElasticSearchFilter(SearchFilter):
+    """
+    Name search for profiles. Served by the Postgres full text index on
+    ``UserProfile.search_vector``, so it has no search cluster to wait on.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, None)
+        if query:
+            return search_profiles(queryset, query)
+        return queryset
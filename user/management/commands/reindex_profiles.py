@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from api.utils import chunked
+from user.models import UserProfile
+from user.search import update_profile_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Recompute the full text search vector of every user profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Profiles updated per statement.')
+
+    def handle(self, *args, **options):
+        user_ids = UserProfile.objects.order_by('id').values_list('user_id', flat=True).iterator()
+        total = 0
+        for chunk in chunked(user_ids, options['chunk_size']):
+            update_profile_search_vectors(chunk)
+            total += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {total} profiles.'))
@@ -1,5 +1,8 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager, Group, Permission
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
 from api.utils import validate_image
 import uuid
@@ -199,7 +202,13 @@ class UserProfile(TimeAt):
     website_link = models.URLField(blank=True, null=True)
     facebook_link = models.URLField(blank=True, null=True)
     youtube_link = models.URLField(blank=True, null=True)
-    last_seen = models.DateTimeField(auto_now=True, db_index=True)
+    last_seen = models.DateTimeField(default=timezone.now, db_index=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='user_profile_search_idx'),
+        ]
 
     def __str__(self):
         return '{} - {}'.format(self.pk, self.user)
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, OuterRef, Q, Subquery
+from api.search import prefix_search_query
+from .models import User, UserProfile
+
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def update_profile_search_vectors(user_ids):
+    """Recompute the names ``search_vector`` of the given users' profiles in one ``UPDATE`` (PostgreSQL only)."""
+    if connection.vendor != 'postgresql':
+        return
+    users = User.objects.filter(pk=OuterRef('user_id'))
+    vector = None
+    for field in NAME_FIELDS:
+        part = SearchVector(Subquery(users.values(field)[:1]), weight='A', config=settings.SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    UserProfile.objects.filter(user_id__in=user_ids).update(search_vector=vector)
+
+
+def search_profiles(queryset, text):
+    """Profiles whose user names match ``text``, best ranked first."""
+    if connection.vendor != 'postgresql':
+        lookup = Q()
+        for field in NAME_FIELDS:
+            lookup |= Q(**{f'user__{field}__icontains': text})
+        return queryset.filter(lookup)
+    search_query = prefix_search_query(text)
+    if search_query is None:
+        return queryset.none()
+    return queryset.filter(search_vector=search_query) \
+        .annotate(rank=SearchRank(F('search_vector'), search_query)) \
+        .order_by('-rank', '-id')
@@ -1,9 +1,37 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from .cache import user_snapshot_cache
 from .models import User, UserProfile
+from .search import NAME_FIELDS, update_profile_search_vectors
 
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    user_snapshot_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_snapshot(sender, instance, **kwargs):
+    user_snapshot_cache.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def update_user_search_vector(sender, instance, created, update_fields=None, **kwargs):
+    # Saves such as the last_login update on every sign in don't touch the names.
+    if created or (update_fields is not None and not update_fields.intersection(NAME_FIELDS)):
+        return
+    update_profile_search_vectors([instance.pk])
+
+
+@receiver(post_save, sender=UserProfile)
+def update_profile_search_vector(sender, instance, created, **kwargs):
+    if created:
+        update_profile_search_vectors([instance.user_id])
@@ -1,3 +1,137 @@
-from django.test import TestCase
+import asyncio
+from unittest import mock
+from django.test import SimpleTestCase, TestCase
+from .cache import UserSnapshotCache
+from .models import User
 
-# Create your tests here.
+
+class FakeLoader:
+    """Stands in for ``load_user``; each call waits until the test releases it."""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def __call__(self, user_id):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return f'user-{user_id}'
+
+
+class UserSnapshotCacheTests(SimpleTestCase):
+    def run_with(self, loader, scenario):
+        async def main():
+            loader.release = asyncio.Event()
+            with mock.patch('user.cache.load_user', loader):
+                return await asyncio.wait_for(scenario(), 5)
+        return asyncio.run(main())
+
+    def test_concurrent_lookups_share_one_load(self):
+        cache, loader = UserSnapshotCache(max_size=10, ttl=60), FakeLoader()
+
+        async def scenario():
+            tasks = [asyncio.create_task(cache.get(1)) for _ in range(5)]
+            await asyncio.sleep(0)
+            loader.release.set()
+            results = await asyncio.gather(*tasks)
+            return results, await cache.get(1)
+
+        results, cached = self.run_with(loader, scenario)
+        self.assertEqual(results, ['user-1'] * 5)
+        self.assertEqual(cached, 'user-1')
+        self.assertEqual(loader.calls, 1)
+
+    def test_every_lookup_gets_its_own_copy(self):
+        cache = UserSnapshotCache(max_size=10, ttl=60)
+        user = User(id=1, username='alice', email='alice@example.com')
+
+        async def scenario():
+            tasks = [asyncio.create_task(cache.get(1)) for _ in range(2)]
+            await asyncio.sleep(0)
+            loader.release.set()
+            return [*await asyncio.gather(*tasks), await cache.get(1)]
+
+        async def loader(user_id):
+            await loader.release.wait()
+            return user
+
+        users = self.run_with(loader, scenario)
+        self.assertEqual(len({id(copy) for copy in users + [user]}), 4)
+        users[0].username = 'changed'
+        self.assertEqual([copy.username for copy in users[1:]], ['alice', 'alice'])
+        self.assertEqual(user.username, 'alice')
+
+    def test_failed_load_reaches_every_waiter(self):
+        cache, loader = UserSnapshotCache(max_size=10, ttl=60), FakeLoader(error=RuntimeError('down'))
+
+        async def scenario():
+            tasks = [asyncio.create_task(cache.get(1)) for _ in range(3)]
+            await asyncio.sleep(0)
+            loader.release.set()
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = self.run_with(loader, scenario)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(cache._in_flight, {})
+
+    def test_cancelled_owner_does_not_strand_waiters(self):
+        cache, loader = UserSnapshotCache(max_size=10, ttl=60), FakeLoader()
+
+        async def scenario():
+            owner = asyncio.create_task(cache.get(1))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(cache.get(1))
+            await asyncio.sleep(0)
+            owner.cancel()
+            await asyncio.sleep(0)
+            loader.release.set()
+            return owner, await waiter
+
+        owner, result = self.run_with(loader, scenario)
+        self.assertTrue(owner.cancelled())
+        self.assertEqual(result, 'user-1')
+        self.assertEqual(loader.calls, 2)
+        self.assertEqual(cache._in_flight, {})
+
+    def test_invalidation_during_load_skips_the_stale_copy(self):
+        cache, loader = UserSnapshotCache(max_size=10, ttl=60), FakeLoader()
+
+        async def scenario():
+            task = asyncio.create_task(cache.get(1))
+            await asyncio.sleep(0)
+            cache.invalidate(1)
+            loader.release.set()
+            return await task
+
+        self.assertEqual(self.run_with(loader, scenario), 'user-1')
+        self.assertEqual(len(cache._entries), 0)
+
+    def test_entries_expire_and_evict_least_recently_used(self):
+        cache = UserSnapshotCache(max_size=2, ttl=60)
+        with mock.patch('user.cache.time.monotonic', return_value=1000):
+            cache._store(1, 'one')
+            cache._store(2, 'two')
+            cache._lookup(1)
+            cache._store(3, 'three')
+            self.assertEqual(list(cache._entries), [1, 3])
+        with mock.patch('user.cache.time.monotonic', return_value=1061):
+            self.assertIsNone(cache._lookup(1))
+
+
+@mock.patch('user.signals.update_profile_search_vectors')
+class UserSearchVectorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(password='password', username='someone', email='someone@example.com')
+
+    def test_saves_of_unindexed_fields_skip_the_update(self, update_vectors):
+        self.user.save(update_fields=['last_login'])
+        update_vectors.assert_not_called()
+
+    def test_name_changes_update_the_vector(self, update_vectors):
+        self.user.first_name = 'Some'
+        self.user.save(update_fields=['first_name', 'last_login'])
+        self.user.save()
+        self.assertEqual(update_vectors.call_args_list, [mock.call([self.user.pk])] * 2)